@@ -0,0 +1,227 @@
+"""
+Benchmark of the timetable generator on synthetic instances of increasing size.
+Each size is seeded with seed_synthetic, then generated once. The script records
+wall time, SQL query count, peak Python memory, exam days used and unscheduled
+modules, writes them to a JSON file and compares them with a stored baseline.
+It also counts the queries of the student and professor timetable endpoints,
+which must not grow with the number of exams (no per-exam queries), and of a
+second student request served from the shared timetable cache.
+
+Runs against DATABASE_URL, or against a throwaway SQLite file by default:
+    python benchmark_generator.py --sizes small medium
+    python benchmark_generator.py --database-url postgresql://.../bench_db
+    python benchmark_generator.py --update-baseline
+
+Exits with status 1 when a metric regressed beyond the tolerance.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Synthetic instance sizes (keyword arguments of seed_synthetic)
+SIZES = {
+    "small": dict(formations=8, students_per_formation=30, modules_per_formation=6,
+                  rooms=20, professors=30),
+    "medium": dict(formations=40, students_per_formation=100, modules_per_formation=8,
+                   rooms=80, professors=120),
+    "large": dict(formations=100, students_per_formation=500, modules_per_formation=10,
+                  rooms=200, professors=400),
+}
+
+# Exam period used for every run
+START_DATE = date(2026, 1, 10)
+PERIOD_DAYS = 90
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Metrics compared with the baseline: measured ones may grow within --tolerance,
+# counted ones must not grow at all
+MEASURED_METRICS = ("seconds", "peak_memory_mb")
+COUNTED_METRICS = ("queries", "days_used", "unscheduled",
+                   "student_timetable_queries", "professor_timetable_queries",
+                   "cached_student_timetable_queries")
+
+
+def run_size(name: str, strategy: str) -> Dict:
+    """Seed one instance and time a full generation on it"""
+    from sqlalchemy import event
+    from database import SessionLocal, engine
+    from models import Examen
+    from seed_synthetic import seed_synthetic
+    from timetable_generator import TimetableGenerator
+
+    seed_synthetic(**SIZES[name])
+
+    queries = [0]
+
+    def count_query(*args):
+        queries[0] += 1
+
+    end_date = START_DATE + timedelta(days=PERIOD_DAYS - 1)
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", count_query)
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = TimetableGenerator(db).generate_timetable(START_DATE, end_date, strategy=strategy)
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        event.remove(engine, "before_cursor_execute", count_query)
+
+    days_used = db.query(Examen.date).filter(
+        Examen.date >= START_DATE, Examen.date <= end_date
+    ).distinct().count()
+    db.close()
+
+    student_queries, professor_queries, cached_queries = timetable_endpoint_queries()
+
+    return {
+        "size": name,
+        "strategy": strategy,
+        "modules": SIZES[name]["formations"] * SIZES[name]["modules_per_formation"],
+        "seconds": round(seconds, 3),
+        "queries": queries[0],
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+        "generated_exams": result["generated_exams"],
+        "days_used": days_used,
+        "unscheduled": result["unscheduled_modules"],
+        "student_timetable_queries": student_queries,
+        "professor_timetable_queries": professor_queries,
+        "cached_student_timetable_queries": cached_queries,
+    }
+
+
+def timetable_endpoint_queries() -> Tuple[int, int, int]:
+    """
+    Queries issued by the student and professor timetable endpoints for the
+    busiest student and professor, once every exam is approved (only approved
+    exams are listed). Must stay constant whatever the number of exams.
+    """
+    from sqlalchemy import event, func
+    from database import SessionLocal, engine
+    from models import Examen, inscriptions, surveillances
+    from main import get_student_timetable, get_professor_timetable
+    from versions import EXAMENS, bump_version
+
+    db = SessionLocal()
+    try:
+        db.query(Examen).update({Examen.dept_head_approved: 1, Examen.vice_dean_approved: 1})
+        bump_version(db, EXAMENS)
+        db.commit()
+        student_id = db.query(inscriptions.c.etudiant_id).group_by(inscriptions.c.etudiant_id).order_by(
+            func.count().desc(), inscriptions.c.etudiant_id
+        ).limit(1).scalar()
+        prof_id = db.query(surveillances.c.prof_id).group_by(surveillances.c.prof_id).order_by(
+            func.count().desc(), surveillances.c.prof_id
+        ).limit(1).scalar()
+    finally:
+        db.close()
+
+    # The student timetable is then read again, from the shared cache
+    counts = []
+    for endpoint, entity_id in ((get_student_timetable, student_id), (get_professor_timetable, prof_id),
+                                (get_student_timetable, student_id)):
+        queries = [0]
+
+        def count_query(*args):
+            queries[0] += 1
+
+        db = SessionLocal()
+        event.listen(engine, "before_cursor_execute", count_query)
+        try:
+            endpoint(entity_id, db)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_query)
+            db.close()
+        counts.append(queries[0])
+    return counts[0], counts[1], counts[2]
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Return a message per metric that is worse than the baseline"""
+    previous = {(row["size"], row["strategy"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        reference = previous.get((row["size"], row["strategy"]))
+        if reference is None:
+            continue
+        for metric in MEASURED_METRICS + COUNTED_METRICS:
+            if metric not in reference:
+                continue  # Baseline older than the metric
+            limit = reference[metric]
+            if metric in MEASURED_METRICS:
+                limit *= 1 + tolerance
+            if row[metric] > limit:
+                regressions.append(
+                    f"{row['size']}/{row['strategy']}: {metric} {row[metric]} > baseline {reference[metric]}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the timetable generator")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--strategies", nargs="+", default=["greedy", "dsatur"])
+    parser.add_argument("--database-url", default=None,
+                        help="Database to use (its data is replaced); defaults to a SQLite file")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative growth of time and memory")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    # database.py reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = args.database_url or os.getenv(
+        "BENCHMARK_DATABASE_URL", "sqlite:///benchmark.db"
+    )
+    from sqlalchemy import event
+    from database import engine
+
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def add_sqlite_functions(connection, record):
+            # Stand-in for the PostgreSQL function used by conflict detection
+            connection.create_function("least", 2, min)
+
+    results = []
+    for name in args.sizes:
+        for strategy in args.strategies:
+            row = run_size(name, strategy)
+            results.append(row)
+            print(f"{name:>7} {strategy:>7}: {row['seconds']:8.3f}s {row['queries']:6d} queries "
+                  f"{row['peak_memory_mb']:8.2f} MB {row['days_used']:4d} days "
+                  f"{row['unscheduled']:4d} unscheduled "
+                  f"{row['student_timetable_queries']}/{row['professor_timetable_queries']}/"
+                  f"{row['cached_student_timetable_queries']} timetable queries")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with (run with --update-baseline)")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if regressions:
+        sys.exit(1)
+    print("No regression against the baseline")
+
+
+if __name__ == "__main__":
+    main()
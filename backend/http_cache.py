@@ -0,0 +1,49 @@
+from hashlib import sha1
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from database import get_db
+from versions import get_versions
+
+# Clients may keep responses but must revalidate them (a 304 is cheap)
+CACHE_CONTROL = "private, no-cache"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+
+def cache_validated(*tables: str):
+    """
+    Route dependency making a read endpoint conditional. The ETag is derived from
+    the versions of the tables the response is built from (see versions.py), the
+    URL and the caller's credentials, so it changes with every write to those
+    tables. A matching If-None-Match is answered with 304 before the endpoint
+    runs: the version lookup is the only query. Put authentication dependencies
+    before this one so a 304 is never served to an unauthorized caller.
+    """
+    def check(request: Request, response: Response, db: Session = Depends(get_db)):
+        versions = get_versions(db, tables)
+        key = "|".join([
+            request.url.path,
+            request.url.query,
+            request.headers.get("authorization", ""),
+            ",".join(f"{table}={version}" for table, version in zip(tables, versions)),
+        ])
+        etag = f'W/"{sha1(key.encode()).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return Depends(check)
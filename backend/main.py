@@ -1,11 +1,12 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from datetime import date, time, timedelta
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, and_
+from datetime import date, timedelta
 from typing import List
 
-from database import get_db, engine, Base
+from database import get_db, engine, Base, SessionLocal
 from models import (
     Departement, Formation, Module, Etudiant, Professeur,
     Batiment, Salle, Examen, inscriptions, surveillances, examens_salles,
@@ -20,10 +21,22 @@ from schemas import (
     Batiment as BatimentSchema, BatimentCreate,
     Salle as SalleSchema, SalleCreate,
     Examen as ExamenSchema, ExamenCreate, ExamenApprovalRequest,
-    TimetableRequest, TimetableResponse, StatisticsResponse, ConflictInfo,
+    TimetableRequest, TimetableResponse, TimetableJob, TimetableRepairRequest, TimetableRepairResponse,
+    StatisticsResponse, ConflictInfo,
     UserLogin, Token, UserCreate, UserResponse
 )
 from timetable_generator import TimetableGenerator
+from timetable_jobs import job_manager
+from timetable_model import MAX_DURATION
+from timetable_repair import TimetableRepair
+from timetable_search import LocalSearch
+from timetable_views import EXPORT_FORMATS, iter_export, student_timetables
+from versions import (
+    DEPARTEMENTS, FORMATIONS, MODULES, ETUDIANTS, INSCRIPTIONS, PROFESSEURS,
+    BATIMENTS, SALLES, EXAMENS, bump_version
+)
+from http_cache import cache_validated
+from pagination import NEXT_CURSOR_HEADER, paginate
 from auth import (
     authenticate_user, create_access_token, get_current_user,
     get_password_hash, require_role, ACCESS_TOKEN_EXPIRE_MINUTES
@@ -38,11 +51,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", NEXT_CURSOR_HEADER],
 )
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# Shared so that FastAPI resolves each once per request
+require_dept_head = require_role([UserRole.DEPT_HEAD, UserRole.ADMIN])
+require_vice_dean = require_role([UserRole.DEAN, UserRole.ADMIN])
+
 # ==================== AUTHENTICATION ====================
 @app.post("/api/auth/login", response_model=Token)
 def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
@@ -96,7 +114,7 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 # ==================== DEPARTMENTS ====================
-@app.get("/api/departements", response_model=List[DepartementSchema])
+@app.get("/api/departements", response_model=List[DepartementSchema], dependencies=[cache_validated(DEPARTEMENTS)])
 def get_departements(db: Session = Depends(get_db)):
     return db.query(Departement).all()
 
@@ -104,12 +122,13 @@ def get_departements(db: Session = Depends(get_db)):
 def create_departement(departement: DepartementCreate, db: Session = Depends(get_db)):
     db_departement = Departement(**departement.dict())
     db.add(db_departement)
+    bump_version(db, DEPARTEMENTS)
     db.commit()
     db.refresh(db_departement)
     return db_departement
 
 # ==================== FORMATIONS ====================
-@app.get("/api/formations", response_model=List[FormationSchema])
+@app.get("/api/formations", response_model=List[FormationSchema], dependencies=[cache_validated(FORMATIONS)])
 def get_formations(dept_id: int = None, db: Session = Depends(get_db)):
     query = db.query(Formation)
     if dept_id:
@@ -120,60 +139,87 @@ def get_formations(dept_id: int = None, db: Session = Depends(get_db)):
 def create_formation(formation: FormationCreate, db: Session = Depends(get_db)):
     db_formation = Formation(**formation.dict())
     db.add(db_formation)
+    bump_version(db, FORMATIONS)
     db.commit()
     db.refresh(db_formation)
     return db_formation
 
 # ==================== MODULES ====================
-@app.get("/api/modules", response_model=List[ModuleSchema])
-def get_modules(formation_id: int = None, db: Session = Depends(get_db)):
+@app.get("/api/modules", response_model=List[ModuleSchema], dependencies=[cache_validated(MODULES)])
+def get_modules(
+    response: Response,
+    formation_id: int = None,
+    limit: int = None,
+    after_id: int = None,
+    fields: str = None,
+    db: Session = Depends(get_db)
+):
     query = db.query(Module)
     if formation_id:
         query = query.filter(Module.formation_id == formation_id)
-    return query.all()
+    return paginate(query, Module, ModuleSchema, response, limit, after_id, fields)
 
 @app.post("/api/modules", response_model=ModuleSchema)
 def create_module(module: ModuleCreate, db: Session = Depends(get_db)):
+    if module.duree_examen is not None and not 0 < module.duree_examen <= MAX_DURATION:
+        raise HTTPException(status_code=400, detail=f"duree_examen must be between 1 and {MAX_DURATION} minutes")
     db_module = Module(**module.dict())
     db.add(db_module)
+    bump_version(db, MODULES)
     db.commit()
     db.refresh(db_module)
     return db_module
 
 # ==================== STUDENTS ====================
-@app.get("/api/etudiants", response_model=List[EtudiantSchema])
-def get_etudiants(formation_id: int = None, db: Session = Depends(get_db)):
+@app.get("/api/etudiants", response_model=List[EtudiantSchema], dependencies=[cache_validated(ETUDIANTS)])
+def get_etudiants(
+    response: Response,
+    formation_id: int = None,
+    limit: int = None,
+    after_id: int = None,
+    fields: str = None,
+    db: Session = Depends(get_db)
+):
     query = db.query(Etudiant)
     if formation_id:
         query = query.filter(Etudiant.formation_id == formation_id)
-    return query.all()
+    return paginate(query, Etudiant, EtudiantSchema, response, limit, after_id, fields)
 
 @app.post("/api/etudiants", response_model=EtudiantSchema)
 def create_etudiant(etudiant: EtudiantCreate, db: Session = Depends(get_db)):
     db_etudiant = Etudiant(**etudiant.dict())
     db.add(db_etudiant)
+    bump_version(db, ETUDIANTS)
     db.commit()
     db.refresh(db_etudiant)
     return db_etudiant
 
 # ==================== PROFESSORS ====================
-@app.get("/api/professeurs", response_model=List[ProfesseurSchema])
-def get_professeurs(dept_id: int = None, db: Session = Depends(get_db)):
+@app.get("/api/professeurs", response_model=List[ProfesseurSchema], dependencies=[cache_validated(PROFESSEURS)])
+def get_professeurs(
+    response: Response,
+    dept_id: int = None,
+    limit: int = None,
+    after_id: int = None,
+    fields: str = None,
+    db: Session = Depends(get_db)
+):
     query = db.query(Professeur)
     if dept_id:
         query = query.filter(Professeur.dept_id == dept_id)
-    return query.all()
+    return paginate(query, Professeur, ProfesseurSchema, response, limit, after_id, fields)
 
 @app.post("/api/professeurs", response_model=ProfesseurSchema)
 def create_professeur(professeur: ProfesseurCreate, db: Session = Depends(get_db)):
     db_professeur = Professeur(**professeur.dict())
     db.add(db_professeur)
+    bump_version(db, PROFESSEURS)
     db.commit()
     db.refresh(db_professeur)
     return db_professeur
 
 # ==================== BUILDINGS ====================
-@app.get("/api/batiments", response_model=List[BatimentSchema])
+@app.get("/api/batiments", response_model=List[BatimentSchema], dependencies=[cache_validated(BATIMENTS)])
 def get_batiments(db: Session = Depends(get_db)):
     return db.query(Batiment).all()
 
@@ -181,12 +227,13 @@ def get_batiments(db: Session = Depends(get_db)):
 def create_batiment(batiment: BatimentCreate, db: Session = Depends(get_db)):
     db_batiment = Batiment(**batiment.dict())
     db.add(db_batiment)
+    bump_version(db, BATIMENTS)
     db.commit()
     db.refresh(db_batiment)
     return db_batiment
 
 # ==================== ROOMS ====================
-@app.get("/api/salles", response_model=List[SalleSchema])
+@app.get("/api/salles", response_model=List[SalleSchema], dependencies=[cache_validated(SALLES)])
 def get_salles(batiment_id: int = None, db: Session = Depends(get_db)):
     query = db.query(Salle)
     if batiment_id:
@@ -197,17 +244,23 @@ def get_salles(batiment_id: int = None, db: Session = Depends(get_db)):
 def create_salle(salle: SalleCreate, db: Session = Depends(get_db)):
     db_salle = Salle(**salle.dict())
     db.add(db_salle)
+    bump_version(db, SALLES)
     db.commit()
     db.refresh(db_salle)
     return db_salle
 
 # ==================== EXAMS ====================
-@app.get("/api/examens", response_model=List[ExamenSchema])
+@app.get("/api/examens", response_model=List[ExamenSchema],
+         dependencies=[Depends(get_current_user), cache_validated(EXAMENS)])
 def get_examens(
+    response: Response,
     module_id: int = None, 
     start_date: date = None, 
     end_date: date = None,
     include_pending: bool = False,  # For admins/dept heads/deans to see all
+    limit: int = None,
+    after_id: int = None,
+    fields: str = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -232,9 +285,9 @@ def get_examens(
         # Department heads see exams waiting for their approval or already approved
         query = query.filter(Examen.dept_head_approved >= 0)
     
-    return query.all()
+    return paginate(query, Examen, ExamenSchema, response, limit, after_id, fields)
 
-@app.get("/api/examens/{examen_id}", response_model=ExamenSchema)
+@app.get("/api/examens/{examen_id}", response_model=ExamenSchema, dependencies=[cache_validated(EXAMENS)])
 def get_examen(examen_id: int, db: Session = Depends(get_db)):
     examen = db.query(Examen).filter(Examen.id == examen_id).first()
     if not examen:
@@ -243,6 +296,8 @@ def get_examen(examen_id: int, db: Session = Depends(get_db)):
 
 @app.post("/api/examens", response_model=ExamenSchema)
 def create_examen(examen: ExamenCreate, db: Session = Depends(get_db)):
+    if not 0 < examen.duree <= MAX_DURATION:
+        raise HTTPException(status_code=400, detail=f"duree must be between 1 and {MAX_DURATION} minutes")
     db_examen = Examen(
         module_id=examen.module_id,
         date=examen.date,
@@ -260,6 +315,7 @@ def create_examen(examen: ExamenCreate, db: Session = Depends(get_db)):
     for prof_id in examen.prof_ids:
         db.execute(surveillances.insert().values(examen_id=db_examen.id, prof_id=prof_id))
     
+    bump_version(db, EXAMENS)
     db.commit()
     db.refresh(db_examen)
     return db_examen
@@ -270,33 +326,150 @@ def delete_examen(examen_id: int, db: Session = Depends(get_db)):
     if not examen:
         raise HTTPException(status_code=404, detail="Examen not found")
     db.delete(examen)
+    bump_version(db, EXAMENS)
     db.commit()
     return {"message": "Examen deleted successfully"}
 
 # ==================== TIMETABLE GENERATION ====================
-@app.post("/api/timetable/generate", response_model=TimetableResponse)
-def generate_timetable(
-    request: TimetableRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.ADMIN]))
-):
-    generator = TimetableGenerator(db)
+def validate_timetable_request(request: TimetableRequest):
+    if request.strategy not in TimetableGenerator.STRATEGIES:
+        raise HTTPException(status_code=400, detail="Invalid scheduling strategy")
+    if not 1 <= request.restarts <= TimetableGenerator.MAX_RESTARTS:
+        raise HTTPException(
+            status_code=400, detail=f"restarts must be between 1 and {TimetableGenerator.MAX_RESTARTS}"
+        )
+    if not 0 <= request.improve_seconds <= LocalSearch.MAX_SECONDS:
+        raise HTTPException(
+            status_code=400, detail=f"improve_seconds must be between 0 and {LocalSearch.MAX_SECONDS}"
+        )
+    if request.departement_id is not None and request.decompose:
+        raise HTTPException(status_code=400, detail="decompose cannot be limited to a department")
+
+def run_timetable_generation(request: TimetableRequest, db: Session, progress=None) -> TimetableResponse:
+    generator = TimetableGenerator(db, progress=progress)
     result = generator.generate_timetable(
         start_date=request.start_date,
         end_date=request.end_date,
         exam_start_time=request.exam_start_time,
-        exam_end_time=request.exam_end_time
+        exam_end_time=request.exam_end_time,
+        strategy=request.strategy,
+        restarts=request.restarts,
+        seed=request.seed,
+        improve_seconds=request.improve_seconds,
+        dry_run=request.dry_run,
+        decompose=request.decompose,
+        profile=request.profile,
+        departement_id=request.departement_id
     )
     
+    if request.dry_run:
+        message = f"Preview: {result['generated_exams']} exams planned, nothing saved"
+    elif result["success"]:
+        message = f"Generated {result['generated_exams']} exams"
+    else:
+        message = "Generation completed with conflicts"
+    
     return TimetableResponse(
         success=result["success"],
-        message=f"Generated {result['generated_exams']} exams" if result["success"] else "Generation completed with conflicts",
+        message=message,
         conflicts=result["conflicts"],
-        generated_exams=result["generated_exams"]
+        generated_exams=result["generated_exams"],
+        exams=result.get("exams", []),
+        profile=result.get("profile"),
+        exact=result.get("exact")
+    )
+
+@app.post("/api/timetable/generate", response_model=TimetableResponse)
+def generate_timetable(
+    request: TimetableRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    validate_timetable_request(request)
+    try:
+        return run_timetable_generation(request, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/timetable/jobs", response_model=TimetableJob, status_code=202)
+def submit_timetable_job(
+    request: TimetableRequest,
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Start a generation in the background and return its job id right away"""
+    validate_timetable_request(request)
+    
+    def run(progress):
+        # Background jobs use their own session, the request one is closed by then
+        db = SessionLocal()
+        try:
+            return run_timetable_generation(request, db, progress)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    # An identical request (same range, scope and options) already running attaches to that job
+    return job_manager.submit(
+        request.model_dump_json(), run,
+        start_date=request.start_date, end_date=request.end_date
+    )
+
+@app.get("/api/timetable/jobs/{job_id}", response_model=TimetableJob)
+def get_timetable_job(
+    job_id: str,
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/timetable/repair", response_model=TimetableRepairResponse)
+def repair_timetable(
+    request: TimetableRepairRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Re-place only the exams affected by one change, keeping the rest of the timetable"""
+    if request.event not in TimetableRepair.EVENTS:
+        raise HTTPException(status_code=400, detail="Invalid repair event")
+    if request.event == "exam_deleted" and request.module_id is None and request.examen_id is None:
+        raise HTTPException(status_code=400, detail="exam_deleted needs module_id or examen_id")
+    if request.event == "room_unavailable" and request.salle_id is None:
+        raise HTTPException(status_code=400, detail="room_unavailable needs salle_id")
+    if request.event == "professor_unavailable" and request.prof_id is None:
+        raise HTTPException(status_code=400, detail="professor_unavailable needs prof_id")
+    
+    generator = TimetableGenerator(db)
+    try:
+        result = generator.repair_timetable(
+            start_date=request.start_date,
+            end_date=request.end_date,
+            event=request.event,
+            module_id=request.module_id,
+            examen_id=request.examen_id,
+            salle_id=request.salle_id,
+            prof_id=request.prof_id,
+            dates=request.dates,
+            exam_start_time=request.exam_start_time,
+            exam_end_time=request.exam_end_time,
+            dry_run=request.dry_run
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    action = "Preview" if request.dry_run else "Repaired"
+    return TimetableRepairResponse(
+        success=result["success"],
+        message=f"{action}: {len(result['changes'])} exams changed",
+        changes=result["changes"],
+        conflicts=result["conflicts"]
     )
 
 # ==================== CONFLICT DETECTION ====================
-@app.get("/api/conflicts", response_model=List[ConflictInfo])
+@app.get("/api/conflicts", response_model=List[ConflictInfo], dependencies=[cache_validated(ETUDIANTS, INSCRIPTIONS, MODULES, PROFESSEURS, SALLES, EXAMENS)])
 def get_conflicts(start_date: date = None, end_date: date = None, db: Session = Depends(get_db)):
     conflicts = []
     
@@ -393,7 +566,7 @@ def get_conflicts(start_date: date = None, end_date: date = None, db: Session =
     return conflicts
 
 # ==================== STATISTICS ====================
-@app.get("/api/statistics", response_model=StatisticsResponse)
+@app.get("/api/statistics", response_model=StatisticsResponse, dependencies=[cache_validated(DEPARTEMENTS, FORMATIONS, MODULES, ETUDIANTS, INSCRIPTIONS, PROFESSEURS, SALLES, EXAMENS)])
 def get_statistics(db: Session = Depends(get_db)):
     total_students = db.query(func.count(Etudiant.id)).scalar()
     total_professors = db.query(func.count(Professeur.id)).scalar()
@@ -447,7 +620,7 @@ def approve_exam_dept_head(
     examen_id: int,
     approval: ExamenApprovalRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.DEPT_HEAD, UserRole.ADMIN]))
+    current_user: User = Depends(require_dept_head)
 ):
     """Department Head approves or rejects an exam"""
     examen = db.query(Examen).filter(Examen.id == examen_id).first()
@@ -455,6 +628,7 @@ def approve_exam_dept_head(
         raise HTTPException(status_code=404, detail="Examen not found")
     
     examen.dept_head_approved = 1 if approval.approved else -1
+    bump_version(db, EXAMENS)
     db.commit()
     db.refresh(examen)
     return {"message": f"Exam {'approved' if approval.approved else 'rejected'} by Department Head", "examen": examen}
@@ -464,7 +638,7 @@ def approve_exam_vice_dean(
     examen_id: int,
     approval: ExamenApprovalRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.DEAN, UserRole.ADMIN]))
+    current_user: User = Depends(require_vice_dean)
 ):
     """Vice-Dean approves or rejects an exam (only if already approved by Dept Head)"""
     examen = db.query(Examen).filter(Examen.id == examen_id).first()
@@ -478,23 +652,24 @@ def approve_exam_vice_dean(
         )
     
     examen.vice_dean_approved = 1 if approval.approved else -1
+    bump_version(db, EXAMENS)
     db.commit()
     db.refresh(examen)
     return {"message": f"Exam {'approved' if approval.approved else 'rejected'} by Vice-Dean", "examen": examen}
 
-@app.get("/api/examens/pending/dept-head")
+@app.get("/api/examens/pending/dept-head", dependencies=[Depends(require_dept_head), cache_validated(EXAMENS)])
 def get_pending_dept_head_approvals(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.DEPT_HEAD, UserRole.ADMIN]))
+    current_user: User = Depends(require_dept_head)
 ):
     """Get exams pending Department Head approval"""
     exams = db.query(Examen).filter(Examen.dept_head_approved == 0).all()
     return exams
 
-@app.get("/api/examens/pending/vice-dean")
+@app.get("/api/examens/pending/vice-dean", dependencies=[Depends(require_vice_dean), cache_validated(EXAMENS)])
 def get_pending_vice_dean_approvals(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.DEAN, UserRole.ADMIN]))
+    current_user: User = Depends(require_vice_dean)
 ):
     """Get exams pending Vice-Dean approval (already approved by Dept Head)"""
     exams = db.query(Examen).filter(
@@ -506,51 +681,19 @@ def get_pending_vice_dean_approvals(
     return exams
 
 # ==================== STUDENT TIMETABLE ====================
-@app.get("/api/etudiants/{etudiant_id}/timetable")
+@app.get("/api/etudiants/{etudiant_id}/timetable", dependencies=[cache_validated(ETUDIANTS, INSCRIPTIONS, MODULES, SALLES, BATIMENTS, PROFESSEURS, EXAMENS)])
 def get_student_timetable(etudiant_id: int, db: Session = Depends(get_db)):
     student = db.query(Etudiant).filter(Etudiant.id == etudiant_id).first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    # Get all exams for modules the student is enrolled in
-    # Only show fully approved exams (both dept head and vice-dean approved)
-    exams = db.query(Examen).join(
-        Module, Examen.module_id == Module.id
-    ).join(
-        inscriptions, Module.id == inscriptions.c.module_id
-    ).filter(
-        and_(
-            inscriptions.c.etudiant_id == etudiant_id,
-            Examen.dept_head_approved == 1,
-            Examen.vice_dean_approved == 1
-        )
-    ).order_by(Examen.date, Examen.heure).all()
-    
-    # Get rooms and professors for each exam
-    timetable = []
-    for exam in exams:
-        rooms = db.query(Salle).join(
-            examens_salles, Salle.id == examens_salles.c.salle_id
-        ).filter(examens_salles.c.examen_id == exam.id).all()
-        
-        professors = db.query(Professeur).join(
-            surveillances, Professeur.id == surveillances.c.prof_id
-        ).filter(surveillances.c.examen_id == exam.id).all()
-        
-        timetable.append({
-            "examen_id": exam.id,
-            "module": exam.module.nom,
-            "date": str(exam.date),
-            "heure": str(exam.heure),
-            "duree": exam.duree,
-            "salles": [{"id": s.id, "nom": s.nom, "batiment": s.batiment.nom} for s in rooms],
-            "professeurs": [{"id": p.id, "nom": p.nom} for p in professors]
-        })
+    # Only fully approved exams, shared by every student with the same modules
+    timetable = student_timetables.get(db, etudiant_id)
     
     return {"etudiant": {"id": student.id, "nom": student.nom, "prenom": student.prenom}, "timetable": timetable}
 
 # ==================== PROFESSOR TIMETABLE ====================
-@app.get("/api/professeurs/{prof_id}/timetable")
+@app.get("/api/professeurs/{prof_id}/timetable", dependencies=[cache_validated(PROFESSEURS, MODULES, SALLES, BATIMENTS, EXAMENS)])
 def get_professor_timetable(prof_id: int, db: Session = Depends(get_db)):
     professor = db.query(Professeur).filter(Professeur.id == prof_id).first()
     if not professor:
@@ -565,25 +708,47 @@ def get_professor_timetable(prof_id: int, db: Session = Depends(get_db)):
             Examen.dept_head_approved == 1,
             Examen.vice_dean_approved == 1
         )
+    ).options(
+        joinedload(Examen.module),
+        selectinload(Examen.salles).joinedload(Salle.batiment)
     ).order_by(Examen.date, Examen.heure).all()
     
     timetable = []
     for exam in exams:
-        rooms = db.query(Salle).join(
-            examens_salles, Salle.id == examens_salles.c.salle_id
-        ).filter(examens_salles.c.examen_id == exam.id).all()
-        
         timetable.append({
             "examen_id": exam.id,
             "module": exam.module.nom,
             "date": str(exam.date),
             "heure": str(exam.heure),
             "duree": exam.duree,
-            "salles": [{"id": s.id, "nom": s.nom, "batiment": s.batiment.nom} for s in rooms]
+            "salles": [{"id": s.id, "nom": s.nom, "batiment": s.batiment.nom} for s in exam.salles]
         })
     
     return {"professeur": {"id": professor.id, "nom": professor.nom}, "timetable": timetable}
 
+# ==================== TIMETABLE EXPORT ====================
+@app.get("/api/timetable/export", dependencies=[
+    Depends(get_current_user),
+    cache_validated(FORMATIONS, MODULES, PROFESSEURS, BATIMENTS, SALLES, EXAMENS)
+])
+def export_timetable(response: Response, format: str = "ndjson", start_date: date = None, end_date: date = None):
+    """Stream the approved timetable (exam, module, formation, rooms, buildings, supervisors) as NDJSON or CSV"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    media_type, write = EXPORT_FORMATS[format]
+
+    def stream():
+        # Own session: the request's one is closed before the body is sent
+        db = SessionLocal()
+        try:
+            yield from write(iter_export(db, start_date, end_date))
+        finally:
+            db.close()
+
+    headers = dict(response.headers)
+    headers["Content-Disposition"] = f'attachment; filename="timetable.{format}"'
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
+
 @app.get("/")
 def root():
     return {"message": "Exam Timetable Optimization Platform API"}
@@ -0,0 +1,12 @@
+-- Migration script to add the per-table data version counters used to invalidate caches and ETags
+-- Run this if you have an existing database without the data_versions table
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_versions (name, version) VALUES
+    ('departements', 0), ('formations', 0), ('modules', 0), ('etudiants', 0), ('inscriptions', 0),
+    ('professeurs', 0), ('batiments', 0), ('salles', 0), ('examens', 0)
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,10 @@
+-- Migration script to add the exam length of each module
+-- Run this if you have an existing database without the duree_examen column
+
+ALTER TABLE modules
+ADD COLUMN IF NOT EXISTS duree_examen INT DEFAULT 120;
+
+-- Existing modules keep the former fixed length of 2 hours
+UPDATE modules
+SET duree_examen = 120
+WHERE duree_examen IS NULL;
@@ -70,6 +70,7 @@ class Module(Base):
     nom = Column(String(150))
     credits = Column(Integer)
     formation_id = Column(Integer, ForeignKey("formations.id"))
+    duree_examen = Column(Integer, default=120)  # Exam length in minutes
     
     formation = relationship("Formation", back_populates="modules")
     examens = relationship("Examen", back_populates="module")
@@ -128,3 +129,9 @@ class Examen(Base):
     module = relationship("Module", back_populates="examens")
     salles = relationship("Salle", secondary=examens_salles, back_populates="examens")
     professeurs = relationship("Professeur", secondary=surveillances, back_populates="examens")
+
+# Version counter per kind of data, used to invalidate caches (see versions.py)
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
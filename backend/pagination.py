@@ -0,0 +1,56 @@
+from typing import List, Optional, Type
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Query
+
+# Largest page a client may ask for
+MAX_LIMIT = 1000
+# Response header carrying the after_id of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[List[str]]:
+    """Field names of a `fields=a,b` projection, checked against the response schema (id always included)"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in names:
+        names.insert(0, "id")
+    return list(dict.fromkeys(names))
+
+
+def paginate(query: Query, model, schema: Type[BaseModel], response: Response,
+             limit: Optional[int] = None, after_id: Optional[int] = None, fields: Optional[str] = None):
+    """
+    Keyset page of a list query: rows with id > after_id in id order, at most
+    `limit` of them (no limit returns every row, as before). When the page is
+    full, the next after_id is sent in the X-Next-Cursor header.
+    With `fields`, only those columns are selected and the rows are returned as
+    plain JSON objects, skipping the ORM entities and the schema validation.
+    """
+    columns = parse_fields(fields, schema)
+    if limit is not None and not 1 <= limit <= MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LIMIT}")
+
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    if limit is not None or after_id is not None:
+        query = query.order_by(model.id).limit(limit)
+    if columns:
+        query = query.with_entities(*(getattr(model, name) for name in columns))
+    rows = query.all()
+
+    if limit is not None and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].id)
+    if columns:
+        # Returned as is, so the headers set so far (cursor, ETag) are carried over
+        return JSONResponse(
+            content=jsonable_encoder([dict(row._mapping) for row in rows]),
+            headers=dict(response.headers)
+        )
+    return rows
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import date, time
+from datetime import date, time, datetime
 from typing import List, Optional
 
 # Department schemas
@@ -34,6 +34,7 @@ class ModuleBase(BaseModel):
     nom: str
     credits: Optional[int] = None
     formation_id: int
+    duree_examen: Optional[int] = 120  # Exam length in minutes (1 to 480)
 
 class ModuleCreate(ModuleBase):
     pass
@@ -127,12 +128,55 @@ class TimetableRequest(BaseModel):
     end_date: date
     exam_start_time: time = time(9, 0)
     exam_end_time: time = time(17, 0)
+    strategy: str = "greedy"  # "greedy" (first fit in module order), "dsatur" (graph colouring) or "exact" (branch and bound, small problems)
+    restarts: int = 1  # > 1 runs that many randomized module orderings in parallel and keeps the best (at most 64)
+    seed: int = 0  # Seed for the randomized orderings (same seed, same timetable)
+    improve_seconds: float = 0  # Wall-clock budget of the local-search improvement stage (0 = off, at most 300)
+    decompose: bool = False  # Solve independent groups of formations in parallel (overrides restarts)
+    dry_run: bool = False  # Preview only: compute the timetable and conflicts without writing anything
+    profile: bool = False  # Record time and SQL per generation phase (returned under "profile")
+    departement_id: Optional[int] = None  # Only reschedule this department's modules, keeping the other exams
 
 class TimetableResponse(BaseModel):
     success: bool
     message: str
     conflicts: List[dict] = []
     generated_exams: int = 0
+    exams: List[dict] = []  # Planned exams, only filled for dry runs
+    profile: Optional[dict] = None  # Phase timings, only filled when requested
+    exact: Optional[dict] = None  # Exact strategy: days, lower bound, nodes, proof, node/time limits, infeasible range
+
+class TimetableRepairRequest(BaseModel):
+    start_date: date
+    end_date: date
+    event: str  # "exam_deleted", "room_unavailable" or "professor_unavailable"
+    module_id: Optional[int] = None  # exam_deleted: module that needs a new exam
+    examen_id: Optional[int] = None  # exam_deleted: exam to delete, if not deleted yet
+    salle_id: Optional[int] = None  # room_unavailable
+    prof_id: Optional[int] = None  # professor_unavailable
+    dates: Optional[List[date]] = None  # Days of unavailability (default: the whole range)
+    exam_start_time: time = time(9, 0)
+    exam_end_time: time = time(17, 0)
+    dry_run: bool = False
+
+class TimetableRepairResponse(BaseModel):
+    success: bool
+    message: str
+    changes: List[dict] = []  # Exams deleted, created, moved or given other rooms/supervisors
+    conflicts: List[dict] = []
+
+class TimetableJob(BaseModel):
+    id: str
+    status: str  # queued, running, completed or failed
+    start_date: date
+    end_date: date
+    percent: float = 0
+    modules_scheduled: int = 0
+    total_modules: int = 0
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[TimetableResponse] = None
+    error: Optional[str] = None
 
 # Conflict detection
 class ConflictInfo(BaseModel):
@@ -4,6 +4,7 @@ from models import (
     Batiment, Salle, Examen, User,
     inscriptions, examens_salles, surveillances
 )
+from versions import ALL_TABLES, CATALOGUE, DEPARTEMENTS, BATIMENTS, bump_version
 
 def clear_database(db):
     """Delete all existing data from the database"""
@@ -25,6 +26,7 @@ def clear_database(db):
         db.query(Formation).delete()
         db.query(Departement).delete()
         
+        bump_version(db, *ALL_TABLES)
         db.commit()
         
     except Exception as e:
@@ -169,6 +171,7 @@ def seed_data():
                     module_id=module.id
                 ))
         
+        bump_version(db, DEPARTEMENTS, BATIMENTS, *CATALOGUE)
         db.commit()
         
     except Exception as e:
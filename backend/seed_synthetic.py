@@ -0,0 +1,200 @@
+"""
+Script to fill the database with a large synthetic dataset for benchmarks.
+Everything is generated from a fixed seed, so two runs with the same
+parameters produce the same rows. Rows are bulk-loaded with COPY on
+PostgreSQL and with executemany inserts on other databases.
+
+Example (about 50k students and 500k enrollments):
+    python seed_synthetic.py --formations 100 --students-per-formation 500 --modules-per-formation 10
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+import argparse
+import csv
+import io
+import random
+import time
+from sqlalchemy import insert, text
+from database import SessionLocal, engine, Base
+from models import (
+    Departement, Formation, Module, Etudiant, Professeur,
+    Batiment, Salle, inscriptions
+)
+from seed_data import clear_database
+from versions import BATIMENTS, CATALOGUE, DEPARTEMENTS, bump_version
+
+LEVELS = ["L1", "L2", "L3", "M1", "M2"]
+
+# (capacity, type) of generated rooms
+ROOM_KINDS = [
+    (20, "Lab"), (25, "Lab"), (30, "Classroom"), (35, "Classroom"),
+    (40, "Classroom"), (50, "Amphitheater"), (60, "Amphitheater"),
+    (80, "Amphitheater"), (100, "Amphitheater"),
+]
+
+# Rows sent per executemany call
+BATCH_SIZE = 10000
+
+
+def bulk_insert(db, table, columns: Sequence[str], rows: Iterable[Tuple]) -> int:
+    """Insert rows (tuples in `columns` order) with COPY on PostgreSQL, executemany elsewhere"""
+    if engine.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        return count
+
+    count = 0
+    batch: List[Dict] = []
+    for row in rows:
+        batch.append(dict(zip(columns, row)))
+        if len(batch) >= BATCH_SIZE:
+            db.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+def reset_sequences(db, tables):
+    """Move PostgreSQL id sequences past the explicit ids written by bulk_insert"""
+    if engine.dialect.name != "postgresql":
+        return
+    for table in tables:
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+        ))
+
+
+def seed_synthetic(departments: int = 4, formations: int = 20, students_per_formation: int = 50,
+                   modules_per_formation: int = 6, rooms: int = 40, professors: int = 60,
+                   cross_ratio: float = 0.1, seed: int = 42) -> Dict[str, int]:
+    """
+    Replace the database content with a generated dataset and return row counts.
+    Each student takes every module of their formation; a `cross_ratio` share of
+    them also takes one module of another formation of the same department.
+    """
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    db = SessionLocal()
+    counts = {}
+
+    try:
+        clear_database(db)
+
+        # ==================== DEPARTMENTS & FORMATIONS ====================
+        counts["departements"] = bulk_insert(
+            db, Departement.__table__, ("id", "nom"),
+            ((d, f"Department {d}") for d in range(1, departments + 1))
+        )
+        formation_dept = {f: (f - 1) % departments + 1 for f in range(1, formations + 1)}
+        counts["formations"] = bulk_insert(
+            db, Formation.__table__, ("id", "nom", "dept_id", "niveau", "nb_modules"),
+            ((f, f"Formation {f}", formation_dept[f], LEVELS[(f - 1) // departments % len(LEVELS)],
+              modules_per_formation) for f in range(1, formations + 1))
+        )
+
+        # ==================== MODULES ====================
+        def modules_of(formation_id):
+            first = (formation_id - 1) * modules_per_formation + 1
+            return range(first, first + modules_per_formation)
+
+        counts["modules"] = bulk_insert(
+            db, Module.__table__, ("id", "nom", "credits", "formation_id"),
+            ((m, f"Module {m}", rng.choice([4, 5, 6]), f)
+             for f in range(1, formations + 1) for m in modules_of(f))
+        )
+
+        # ==================== STUDENTS ====================
+        def student_id(formation_id, index):
+            return (formation_id - 1) * students_per_formation + index + 1
+
+        counts["etudiants"] = bulk_insert(
+            db, Etudiant.__table__, ("id", "matricule", "nom", "prenom", "formation_id", "promo"),
+            ((student_id(f, s), f"S{student_id(f, s):08d}", f"Nom{s}", f"Prenom{s}", f, 2024)
+             for f in range(1, formations + 1) for s in range(students_per_formation))
+        )
+
+        # ==================== PROFESSORS ====================
+        counts["professeurs"] = bulk_insert(
+            db, Professeur.__table__, ("id", "nom", "dept_id", "specialite"),
+            ((p, f"Dr. Professor {p}", (p - 1) % departments + 1, "General")
+             for p in range(1, professors + 1))
+        )
+
+        # ==================== BUILDINGS & ROOMS ====================
+        counts["batiments"] = bulk_insert(
+            db, Batiment.__table__, ("id", "nom"),
+            ((b, f"Building {b}") for b in range(1, departments + 1))
+        )
+        room_rows = []
+        for r in range(1, rooms + 1):
+            capacity, kind = rng.choice(ROOM_KINDS)
+            room_rows.append((r, f"R{r:04d}", capacity, kind, (r - 1) % departments + 1))
+        counts["salles"] = bulk_insert(
+            db, Salle.__table__, ("id", "nom", "capacite", "type", "batiment_id"), room_rows
+        )
+
+        # ==================== STUDENT ENROLLMENTS ====================
+        formations_by_dept: Dict[int, List[int]] = {}
+        for f, d in formation_dept.items():
+            formations_by_dept.setdefault(d, []).append(f)
+
+        def enrollments():
+            for f in range(1, formations + 1):
+                own = modules_of(f)
+                others = [o for o in formations_by_dept[formation_dept[f]] if o != f]
+                for s in range(students_per_formation):
+                    etudiant_id = student_id(f, s)
+                    for m in own:
+                        yield etudiant_id, m
+                    if others and rng.random() < cross_ratio:
+                        yield etudiant_id, rng.choice(modules_of(rng.choice(others)))
+
+        counts["inscriptions"] = bulk_insert(
+            db, inscriptions, ("etudiant_id", "module_id"), enrollments()
+        )
+
+        reset_sequences(db, [
+            Departement.__table__, Formation.__table__, Module.__table__, Etudiant.__table__,
+            Professeur.__table__, Batiment.__table__, Salle.__table__,
+        ])
+        bump_version(db, DEPARTEMENTS, BATIMENTS, *CATALOGUE)
+        db.commit()
+        return counts
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a large synthetic dataset")
+    parser.add_argument("--departments", type=int, default=4)
+    parser.add_argument("--formations", type=int, default=20)
+    parser.add_argument("--students-per-formation", type=int, default=50)
+    parser.add_argument("--modules-per-formation", type=int, default=6)
+    parser.add_argument("--rooms", type=int, default=40)
+    parser.add_argument("--professors", type=int, default=60)
+    parser.add_argument("--cross-ratio", type=float, default=0.1,
+                        help="Share of students also enrolled in a module of another formation")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = seed_synthetic(**vars(args))
+    for table, count in counts.items():
+        print(f"{table:>12}: {count}")
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
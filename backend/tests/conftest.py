@@ -0,0 +1,42 @@
+"""
+Tests run against a throwaway SQLite file seeded with seed_synthetic.
+database.py reads DATABASE_URL on import, so it is set before any backend import.
+"""
+import os
+import sys
+import tempfile
+
+DATABASE_FILE = os.path.join(tempfile.mkdtemp(prefix="exam_tests_"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_FILE}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event
+
+from database import SessionLocal, engine
+from seed_synthetic import seed_synthetic
+
+
+@event.listens_for(engine, "connect")
+def add_sqlite_functions(connection, record):
+    # Stand-in for the PostgreSQL function used by conflict detection
+    connection.create_function("least", 2, min)
+
+
+# Same shape as the "small" benchmark instance
+SMALL = dict(formations=8, students_per_formation=30, modules_per_formation=6, rooms=20, professors=30)
+
+
+@pytest.fixture
+def seeded():
+    """Database freshly seeded with the small synthetic instance"""
+    seed_synthetic(**SMALL)
+
+
+@pytest.fixture
+def db(seeded):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
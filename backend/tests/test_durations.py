@@ -0,0 +1,35 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from models import Module
+from timetable_generator import TimetableGenerator
+from versions import MODULES, bump_version
+
+
+@pytest.mark.parametrize("duree_examen, status", [(-30, 400), (0, 400), (900, 400), (90, 200), (480, 200)])
+def test_create_module_checks_duration(seeded, duree_examen, status):
+    response = TestClient(app).post("/api/modules", json={
+        "nom": "Module", "credits": 3, "formation_id": 1, "duree_examen": duree_examen
+    })
+    assert response.status_code == status
+
+
+def test_generation_reports_unusable_durations(db):
+    negative, too_long = [module_id for (module_id,) in db.query(Module.id).order_by(Module.id).limit(2)]
+    db.query(Module).filter(Module.id == negative).update({Module.duree_examen: -30})
+    db.query(Module).filter(Module.id == too_long).update({Module.duree_examen: 600})
+    bump_version(db, MODULES)
+    db.commit()
+
+    result = TimetableGenerator(db).generate_timetable(
+        date(2026, 1, 10), date(2026, 1, 31), strategy="dsatur", dry_run=True
+    )
+
+    invalid = {c["module_id"]: c["duree"] for c in result["conflicts"] if c["type"] == "invalid_duration"}
+    assert invalid == {negative: -30, too_long: 600}
+    assert result["unscheduled_modules"] == 2
+    assert not any(c["type"] == "date_range" for c in result["conflicts"])
+    assert all(exam["duree"] > 0 for exam in result["exams"])
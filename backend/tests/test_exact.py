@@ -0,0 +1,90 @@
+import time
+from datetime import date
+
+import pytest
+
+from models import Examen, Formation, Module
+from timetable_exact import ExactColouring
+from timetable_generator import TimetableGenerator
+
+START = date(2026, 1, 10)
+
+
+def generate_exact(db, end):
+    return TimetableGenerator(db).generate_timetable(START, end, strategy="exact", dry_run=True)
+
+
+def test_exact_range_too_short_is_infeasible(db):
+    result = generate_exact(db, date(2026, 1, 14))
+
+    report = result["exact"]
+    assert result["unscheduled_modules"] > 0
+    assert report["infeasible"] is True
+    assert report["proven_optimal"] is False
+    assert report["unscheduled"] == result["unscheduled_modules"]
+    assert report["days"] is None
+
+
+def test_exact_proves_day_count(db):
+    result = generate_exact(db, date(2026, 1, 31))
+
+    report = result["exact"]
+    assert result["unscheduled_modules"] == 0
+    assert report["infeasible"] is False
+    assert report["proven_optimal"] is True
+    assert report["days"] == report["lower_bound"]
+    assert report["days"] == len({exam["date"] for exam in result["exams"]})
+
+
+def test_department_run_keeps_other_departments(db):
+    end = date(2026, 1, 31)
+    TimetableGenerator(db).generate_timetable(START, end, strategy="dsatur")
+    kept = {
+        (exam_id, module_id, exam_date, heure)
+        for exam_id, module_id, exam_date, heure, dept_id in exams_with_department(db) if dept_id != 1
+    }
+
+    result = TimetableGenerator(db).generate_timetable(START, end, strategy="exact", departement_id=1)
+
+    rows = exams_with_department(db)
+    assert result["unscheduled_modules"] == 0
+    assert result["conflicts"] == []
+    assert {(e, m, d, h) for e, m, d, h, dept_id in rows if dept_id != 1} == kept
+    assert len([row for row in rows if row[4] == 1]) == result["generated_exams"]
+    assert result["exact"]["node_limit"] == ExactColouring.NODE_LIMIT
+
+
+def test_department_run_cannot_be_decomposed(db):
+    with pytest.raises(ValueError):
+        TimetableGenerator(db).generate_timetable(
+            START, date(2026, 1, 31), departement_id=1, decompose=True, dry_run=True
+        )
+
+
+def test_slow_placements_stop_at_time_limit():
+    # Six unrelated modules: many colourings, each handed to a slow, rejecting placement
+    modules = list(range(6))
+    search = ExactColouring(
+        modules, {m: 0 for m in modules}, {m: 1 << m for m in modules},
+        {m: (1,) for m in modules}, (10,), time_limit=0.2
+    )
+
+    def accept(colouring):
+        time.sleep(0.05)
+        return False
+
+    started = time.perf_counter()
+    report = search.solve(6, accept)
+
+    assert time.perf_counter() - started < 0.4
+    assert report["limit_reached"] is True
+    assert report["proven_optimal"] is False
+    assert report["days"] == 6
+
+
+def exams_with_department(db):
+    return db.query(Examen.id, Examen.module_id, Examen.date, Examen.heure, Formation.dept_id).join(
+        Module, Examen.module_id == Module.id
+    ).join(
+        Formation, Module.formation_id == Formation.id
+    ).all()
@@ -0,0 +1,36 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from timetable_generator import TimetableGenerator
+from timetable_profile import PhaseProfiler
+
+
+def test_profiler_ignores_other_sessions(db):
+    other = SessionLocal()
+    profiler = PhaseProfiler(db)
+    try:
+        with profiler.phase("work"):
+            db.execute(text("SELECT 1"))
+            other.execute(text("SELECT 2"))
+            db.commit()
+            # A new transaction, possibly on another pooled connection
+            db.execute(text("SELECT 3"))
+    finally:
+        profiler.close()
+        other.close()
+
+    phase = next(p for p in profiler.report()["phases"] if p["name"] == "work")
+    assert phase["queries"] == 2
+    assert [s["sql"] for s in phase["statements"]] == ["SELECT 1", "SELECT 3"]
+
+
+def test_profiled_generation_counts_its_queries(db):
+    result = TimetableGenerator(db).generate_timetable(
+        date(2026, 1, 10), date(2026, 1, 31), strategy="dsatur", profile=True
+    )
+
+    phases = {phase["name"]: phase for phase in result["profile"]["phases"]}
+    assert phases["load_model"]["queries"] > 0
+    assert phases["persist_insert"]["queries"] > 0
@@ -0,0 +1,23 @@
+from datetime import date, timedelta
+
+from models import Examen
+from timetable_generator import TimetableGenerator
+from timetable_model import model_cache
+
+START, END = date(2026, 1, 10), date(2026, 1, 31)
+
+
+def test_moved_exams_keep_their_new_duration(db):
+    generator = TimetableGenerator(db)
+    generator.generate_timetable(START, END, strategy="dsatur")
+    old = next(exam for exam in model_cache.get(db).exams if exam["date"] < END)
+    # A move planned with the module's current duration, as _relocate does
+    moved = dict(old, date=old["date"] + timedelta(days=1), duree=old["duree"] + 30,
+                 dept_head_approved=0, vice_dean_approved=0)
+
+    generator._persist_changes([(old, moved)])
+    db.commit()
+
+    db.expire_all()
+    row = db.get(Examen, old["id"])
+    assert (row.date, row.duree) == (moved["date"], moved["duree"])
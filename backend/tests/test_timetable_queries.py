@@ -0,0 +1,70 @@
+from datetime import date
+
+from sqlalchemy import event, func
+
+import main
+from database import SessionLocal, engine
+from main import get_professor_timetable, get_student_timetable
+from models import Examen, inscriptions, surveillances
+from timetable_generator import TimetableGenerator
+from timetable_views import StudentTimetableCache
+from versions import EXAMENS, bump_version
+
+# Queries per request, whatever the number of exams: student (versions, student,
+# enrollments, exams, rooms, supervisors), professor (professor, exams, rooms)
+STUDENT_QUERIES = 6
+PROFESSOR_QUERIES = 3
+
+
+def generate_approved(db, start, end):
+    TimetableGenerator(db).generate_timetable(start, end, strategy="dsatur")
+    db.query(Examen).update({Examen.dept_head_approved: 1, Examen.vice_dean_approved: 1})
+    bump_version(db, EXAMENS)
+    db.commit()
+
+
+def busiest(db, column):
+    return db.query(column).group_by(column).order_by(func.count().desc(), column).limit(1).scalar()
+
+
+def count_queries(endpoint, entity_id):
+    queries = []
+
+    def count_query(*args):
+        queries.append(args[2])
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", count_query)
+    try:
+        result = endpoint(entity_id, db)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_query)
+        db.close()
+    return len(queries), len(result["timetable"])
+
+
+def test_timetable_queries_do_not_grow_with_exams(db, monkeypatch):
+    # One exam session, then a second one: every student and professor has more exams
+    counts = []
+    for start, end in ((date(2026, 1, 10), date(2026, 1, 31)), (date(2026, 6, 1), date(2026, 6, 30))):
+        generate_approved(db, start, end)
+        # Cold student cache, so both measures include the enrollment lookup
+        monkeypatch.setattr(main, "student_timetables", StudentTimetableCache())
+        student_id = busiest(db, inscriptions.c.etudiant_id)
+        prof_id = busiest(db, surveillances.c.prof_id)
+        counts.append((count_queries(get_student_timetable, student_id), count_queries(get_professor_timetable, prof_id)))
+
+    (student_before, prof_before), (student_after, prof_after) = counts
+    assert student_after[1] > student_before[1] and prof_after[1] > prof_before[1]
+    assert student_before[0] == student_after[0] == STUDENT_QUERIES
+    assert prof_before[0] == prof_after[0] == PROFESSOR_QUERIES
+
+
+def test_shared_student_timetable_costs_fewer_queries(db):
+    generate_approved(db, date(2026, 1, 10), date(2026, 1, 31))
+    student_id = busiest(db, inscriptions.c.etudiant_id)
+
+    count_queries(get_student_timetable, student_id)
+    queries, exams = count_queries(get_student_timetable, student_id)
+    assert exams > 0
+    assert queries == 2  # versions and the student, the timetable comes from the cache
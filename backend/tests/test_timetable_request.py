@@ -0,0 +1,58 @@
+import threading
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from main import validate_timetable_request
+from schemas import TimetableRequest
+
+
+def request(**fields):
+    return TimetableRequest(start_date=date(2026, 1, 10), end_date=date(2026, 1, 31), **fields)
+
+
+@pytest.mark.parametrize("fields", [
+    dict(restarts=0),
+    dict(restarts=65),
+    dict(restarts=100000),
+    dict(improve_seconds=-1),
+    dict(improve_seconds=86400),
+])
+def test_rejected_requests(fields):
+    with pytest.raises(HTTPException) as error:
+        validate_timetable_request(request(**fields))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("fields", [
+    dict(),
+    dict(restarts=64),
+    dict(improve_seconds=300),
+])
+def test_accepted_requests(fields):
+    validate_timetable_request(request(**fields))
+
+
+def test_job_key_covers_whole_request(monkeypatch):
+    import main
+    from timetable_jobs import JobManager
+
+    release = threading.Event()
+
+    def run_timetable_generation(request, db, progress=None):
+        release.wait(5)
+        return {}
+
+    monkeypatch.setattr(main, "job_manager", JobManager())
+    monkeypatch.setattr(main, "run_timetable_generation", run_timetable_generation)
+    try:
+        first = main.submit_timetable_job(request(departement_id=1), current_user=None)
+        again = main.submit_timetable_job(request(departement_id=1), current_user=None)
+        other = main.submit_timetable_job(request(departement_id=2), current_user=None)
+        seeded = main.submit_timetable_job(request(departement_id=1, seed=7), current_user=None)
+    finally:
+        release.set()
+
+    assert again["id"] == first["id"]
+    assert len({first["id"], other["id"], seeded["id"]}) == 3
@@ -0,0 +1,219 @@
+from typing import Callable, Dict, List, Tuple
+import time as clock
+
+
+class ExactColouring:
+    """
+    Branch and bound over the day-conflict graph: finds the fewest exam days
+    such that no two modules sharing a student or a formation sit on the same day,
+    and proves it when the search finishes within its limits.
+    - bitsets: neighbours and forbidden days of each module are Python ints
+    - symmetry breaking: the modules of a clique found up front get days 0..k-1,
+      and a module only opens a new day when it is the next unused one
+    - propagation (forward checking): after each choice, a module left with no
+      possible day cuts the branch
+    - branching: the module with the most forbidden days first (DSatur order)
+    A day also has a room and supervision budget (`need` against `capacity`), a
+    relaxation of the real room/professor check; every complete colouring is
+    handed to `accept`, which places it for real and may reject it.
+    """
+    # Search limits, after which the best colouring found so far is kept
+    NODE_LIMIT = 200000
+    TIME_LIMIT = 10.0
+    # Share of the time limit after which the clock is read on every node
+    CLOSING_SHARE = 0.9
+
+    def __init__(self, modules: List[int], neighbours: Dict[int, int], bit_of: Dict[int, int],
+                 need: Dict[int, tuple], capacity: tuple,
+                 node_limit: int = NODE_LIMIT, time_limit: float = TIME_LIMIT):
+        self.modules = modules
+        self.size = len(modules)
+        # Neighbours re-indexed on the position of each module in `modules`
+        position = {bit_of[module_id]: i for i, module_id in enumerate(modules)}
+        self.adjacent: List[int] = []
+        for module_id in modules:
+            mask = 0
+            remaining = neighbours[module_id]
+            while remaining:
+                low = remaining & -remaining
+                remaining ^= low
+                i = position.get(low)
+                if i is not None:
+                    mask |= 1 << i
+            self.adjacent.append(mask)
+        self.degree = [bin(mask).count("1") for mask in self.adjacent]
+        self.need = [need[module_id] for module_id in modules]
+        self.capacity = capacity
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+
+        self.nodes = 0
+        self.stopped = False
+        # Set once the time used is close to the limit
+        self.closing = False
+        # A colouring was found but could not be placed, so the bound is not proven
+        self.rejected = False
+
+    # ==================== SEARCH ====================
+    def solve(self, upper_bound: int, accept: Callable[[List[int]], bool], feasible: bool = True) -> Dict:
+        """
+        Look for colourings with fewer than `upper_bound` days. Every complete
+        colouring (day index per module, in `modules` order) is passed to `accept`;
+        an accepted one becomes the new bound. `feasible` tells whether a timetable
+        with `upper_bound` days is already known; when it is not, nothing is proven
+        unless a colouring is accepted. Returns the best day count, the lower bound,
+        the nodes explored, whether the best count is proven minimal and the limits.
+        """
+        self.started = clock.perf_counter()
+        self.accept = accept
+        self.upper_bound = upper_bound
+        self.found = feasible
+
+        clique = self._clique()
+        self.lower_bound = len(clique)
+        self.colour = [-1] * self.size
+        self.forbidden = [0] * self.size
+        self.load = []
+        searching = self.upper_bound > self.lower_bound
+        for day, i in enumerate(clique if searching else []):
+            if not self._fits(i, day):
+                # Not even the clique fits the daily budgets: keep the caller's result
+                self.stopped = True
+                break
+            self.load.append(tuple(self.need[i]))
+            if not self._assign(i, day)[1]:
+                # Some module has no day left: nothing beats the upper bound
+                searching = False
+                break
+
+        if searching and not self.stopped:
+            self._branch(self.size - len(clique), len(clique))
+
+        return {
+            "days": self.upper_bound,
+            "lower_bound": self.lower_bound,
+            "nodes": self.nodes,
+            "proven_optimal": self.found and not self.stopped and not self.rejected,
+            # Limits in force, and whether the search stopped on one of them
+            "node_limit": self.node_limit,
+            "time_limit": self.time_limit,
+            "limit_reached": self.stopped,
+        }
+
+    def _out_of_time(self) -> bool:
+        elapsed = clock.perf_counter() - self.started
+        if elapsed >= self.time_limit:
+            self.stopped = True
+        elif elapsed >= self.time_limit * self.CLOSING_SHARE:
+            self.closing = True
+        return self.stopped
+
+    def _branch(self, uncoloured: int, days_used: int):
+        if uncoloured == 0:
+            # Placing a colouring is the costly step: never start one past the limit
+            if self._out_of_time():
+                return
+            if self.accept(list(self.colour)):
+                self.upper_bound = days_used
+                self.found = True
+            else:
+                self.rejected = True
+            return
+
+        self.nodes += 1
+        if self.nodes >= self.node_limit:
+            self.stopped = True
+            return
+        # The clock is read every 1024 nodes, then on every node near the limit
+        if (self.closing or self.nodes % 1024 == 0) and self._out_of_time():
+            return
+
+        i = self._most_constrained()
+        # Existing days, then one new day (any unused day is equivalent)
+        for day in range(min(days_used + 1, self.upper_bound - 1)):
+            if day >= self.upper_bound - 1:
+                break  # A colouring found meanwhile lowered the bound
+            if self.forbidden[i] >> day & 1 or not self._fits(i, day):
+                continue
+            opened = day == days_used
+            if opened:
+                self.load.append((0,) * len(self.capacity))
+            self.load[day] = tuple(a + b for a, b in zip(self.load[day], self.need[i]))
+            changed, alive = self._assign(i, day)
+            if alive:
+                self._branch(uncoloured - 1, days_used + opened)
+            self._unassign(i, day, changed)
+            self.load[day] = tuple(a - b for a, b in zip(self.load[day], self.need[i]))
+            if opened:
+                self.load.pop()
+            if self.stopped or self.upper_bound <= self.lower_bound:
+                return
+
+    def _assign(self, i: int, day: int) -> Tuple[List[int], bool]:
+        """
+        Give module i the day and forbid it to its uncoloured neighbours. Returns the
+        neighbours changed (for _unassign) and False when one of them has no day left.
+        """
+        self.colour[i] = day
+        bit = 1 << day
+        days_allowed = (1 << (self.upper_bound - 1)) - 1
+        changed = []
+        alive = True
+        remaining = self.adjacent[i]
+        while remaining:
+            low = remaining & -remaining
+            remaining ^= low
+            j = low.bit_length() - 1
+            if self.colour[j] >= 0 or self.forbidden[j] & bit:
+                continue
+            self.forbidden[j] |= bit
+            changed.append(j)
+            if self.forbidden[j] & days_allowed == days_allowed:
+                alive = False
+        return changed, alive
+
+    def _unassign(self, i: int, day: int, changed: List[int]):
+        self.colour[i] = -1
+        bit = ~(1 << day)
+        for j in changed:
+            self.forbidden[j] &= bit
+
+    def _fits(self, i: int, day: int) -> bool:
+        """Whether module i fits within the day's room and supervision budget"""
+        load = self.load[day] if day < len(self.load) else (0,) * len(self.capacity)
+        return all(a + b <= c for a, b, c in zip(load, self.need[i], self.capacity))
+
+    def _most_constrained(self) -> int:
+        best, best_key = -1, None
+        for i in range(self.size):
+            if self.colour[i] >= 0:
+                continue
+            key = (bin(self.forbidden[i]).count("1"), self.degree[i])
+            if best_key is None or key > best_key:
+                best, best_key = i, key
+        return best
+
+    def _clique(self) -> List[int]:
+        """Large clique grown greedily from each module (a lower bound on the days)"""
+        best: List[int] = []
+        for start in sorted(range(self.size), key=lambda i: -self.degree[i]):
+            if self.degree[start] + 1 <= len(best):
+                break
+            clique = [start]
+            candidates = self.adjacent[start]
+            while candidates:
+                # Candidate with the most neighbours among the other candidates
+                pick, pick_count = -1, -1
+                remaining = candidates
+                while remaining:
+                    low = remaining & -remaining
+                    remaining ^= low
+                    j = low.bit_length() - 1
+                    count = bin(self.adjacent[j] & candidates).count("1")
+                    if count > pick_count:
+                        pick, pick_count = j, count
+                clique.append(pick)
+                candidates &= self.adjacent[pick]
+            if len(clique) > len(best):
+                best = clique
+        return best
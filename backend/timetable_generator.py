@@ -1,16 +1,62 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, select, insert, update, bindparam, text
 from datetime import date, time, timedelta
-from typing import List, Dict, Tuple
-from models import Examen, Module, Etudiant, Professeur, Salle, Formation, Departement, inscriptions, surveillances, examens_salles
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter, defaultdict
+from bisect import bisect_left
+import heapq
+import os
+import random
+from typing import Callable, List, Dict, Set, Tuple
+from models import Examen, surveillances, examens_salles
+from timetable_model import DEFAULT_DURATION, ProblemModel, ScheduleState, minutes, model_cache
+from timetable_search import LocalSearch
+from timetable_exact import ExactColouring
+from timetable_repair import TimetableRepair
+from timetable_profile import NULL_PROFILER, PhaseProfiler
+from timetable_snapshot import load_snapshot
+from versions import EXAMENS, bump_version
 
 class TimetableGenerator:
-    def __init__(self, db: Session):
+    # Scheduling engines selectable through TimetableRequest.strategy
+    STRATEGIES = ("greedy", "dsatur", "exact")
+    
+    # Exams may start every SLOT_MINUTES from the start of the exam day
+    SLOT_MINUTES = 30
+    
+    # Most orderings a multi-start run may try (each is a full run in the process pool)
+    MAX_RESTARTS = 64
+    
+    # Helper methods timed when a run is profiled (times are inclusive)
+    PROFILED_HELPERS = (
+        "_initial_state", "_place_modules", "_try_slot", "_check_formation_conflict",
+        "_check_student_conflicts", "_find_rooms_for_students_by_formation",
+        "_assign_professors", "_allocate_exam_ids", "_describe_exams",
+    )
+    
+    def __init__(self, db: Session, model: ProblemModel = None, progress: Callable = None):
         self.db = db
+        # Problem data is loaded lazily (see ModelCache) unless a model is given
+        self.model = model
+        # Optional progress(percent, modules_scheduled, total_modules) callback
+        self.progress = progress
+        # Replaced by a PhaseProfiler for the duration of a profiled run
+        self.profiler = NULL_PROFILER
+        # Outcome of the last exact search (days, lower bound, nodes, proof)
+        self.exact_report = None
+        # Modules rescheduled by a department-scoped run (None: every module)
+        self.scope: Set[int] = None
+        # End of the exam day in minutes: every exam must be over by then
+        self.day_end = minutes(time(17, 0))
         
     def generate_timetable(self, start_date: date, end_date: date, 
                           exam_start_time: time = time(9, 0), 
-                          exam_end_time: time = time(17, 0)) -> Dict:
+                          exam_end_time: time = time(17, 0),
+                          strategy: str = "greedy",
+                          restarts: int = 1, seed: int = 0,
+                          improve_seconds: float = 0, dry_run: bool = False,
+                          decompose: bool = False, profile: bool = False,
+                          departement_id: int = None) -> Dict:
         """
         Generate an optimized exam timetable that respects all constraints:
         - Students: Max 1 exam per day
@@ -20,477 +66,1095 @@ class TimetableGenerator:
         - Department priority: Teachers supervise their department exams first
         - Equal distribution: All teachers have similar number of supervisions
         - Formation constraint: Exams from the same formation cannot be on the same day
+
+        The input data is read once into a ProblemModel and the whole search runs
+        in memory; the database is only written when the timetable is complete.
+        The catalogue part of the model is cached between runs until it changes.
+        `strategy` selects the scheduling engine (see STRATEGIES). With `restarts` > 1
+        the engine is run on that many module orderings in a process pool and only
+        the best timetable is kept; the orderings are derived from `seed`.
+        The "exact" engine returns its search outcome under "exact" (single runs only).
+        With `decompose` the modules are split into groups sharing no students or
+        formation, which are solved in parallel with their own share of rooms and
+        professors and then merged (this takes precedence over `restarts`).
+        With `departement_id` only the modules of that department are rescheduled;
+        the other exams of the date range are kept and keep their rooms and
+        supervisors (useful for the exact engine on one department).
+        With `improve_seconds` > 0 a local search (see LocalSearch) then tries to use
+        fewer days and balance supervisions for at most that many seconds.
+        With `dry_run` nothing is written: the timetable and its conflict report are
+        computed in memory and returned (under "exams") for preview.
+        With `profile` the time, SQL statements and helper calls of each phase are
+        recorded (see PhaseProfiler), logged and returned under "profile". Work done
+        in worker processes (restarts, decompose) only shows up as phase time.
         """
-        # Get all modules that need exams
-        modules = self.db.query(Module).all()
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown scheduling strategy: {strategy}")
+        if self.db is None and not dry_run:
+            raise ValueError("Saving a timetable needs a database session (use dry_run)")
+        if departement_id is not None and decompose:
+            raise ValueError("decompose splits the whole catalogue and cannot be limited to a department")
+        
+        if not profile:
+            return self._generate(start_date, end_date, exam_start_time, exam_end_time, strategy,
+                                  restarts, seed, improve_seconds, dry_run, decompose, departement_id)
+        
+        self.profiler = PhaseProfiler(self.db)
+        self.profiler.instrument(self, self.PROFILED_HELPERS)
+        try:
+            result = self._generate(start_date, end_date, exam_start_time, exam_end_time, strategy,
+                                    restarts, seed, improve_seconds, dry_run, decompose, departement_id)
+        finally:
+            self.profiler.close()
+        result["profile"] = self.profiler.report()
+        self.profiler.log(result["profile"])
+        self.profiler = NULL_PROFILER
+        return result
+    
+    def _generate(self, start_date: date, end_date: date, exam_start_time: time, exam_end_time: time,
+                  strategy: str, restarts: int, seed: int, improve_seconds: float, dry_run: bool,
+                  decompose: bool, departement_id: int = None) -> Dict:
+        """Body of generate_timetable, split by profiling phase"""
+        profiler = self.profiler
+        if self.model is None:
+            with profiler.phase("load_model"):
+                self.model = model_cache.get(self.db)
+        model = self.model
+        if departement_id is not None:
+            self.scope = {module_id for module_id in model.module_ids if model.module_dept(module_id) == departement_id}
+            if not self.scope:
+                raise ValueError(f"Department {departement_id} has no modules")
+        self._report_progress(5, 0)
         
-        # Get all available rooms
-        rooms = self.db.query(Salle).order_by(Salle.capacite.desc()).all()
+        available_slots = self._generate_time_slots(exam_start_time, exam_end_time)
+        self.day_end = minutes(exam_end_time)
         
-        # Get all professors
-        professors = self.db.query(Professeur).all()
+        with profiler.phase("schedule"):
+            if decompose:
+                state, new_exams, unscheduled = self._solve_decomposed(
+                    start_date, end_date, available_slots, strategy
+                )
+            elif restarts > 1:
+                state, new_exams, unscheduled = self._solve_multi_start(
+                    start_date, end_date, available_slots, strategy, restarts, seed
+                )
+            else:
+                state, new_exams, unscheduled = self._solve(
+                    start_date, end_date, available_slots, strategy, self._module_order(seed, 0)
+                )
+        
+        self._report_progress(80, len(new_exams))
         
-        # Delete existing exams for the date range
-        self.db.query(Examen).filter(
-            and_(Examen.date >= start_date, Examen.date <= end_date)
-        ).delete()
-        self.db.commit()
+        if improve_seconds > 0:
+            with profiler.phase("improve"):
+                days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+                search = LocalSearch(self, state, new_exams, unscheduled, days, available_slots, seed)
+                new_exams, unscheduled = search.run(improve_seconds)
+                state = self._initial_state(start_date, end_date)
+                for exam in new_exams:
+                    state.place(exam)
         
-        generated_exams = []
         conflicts = []
+        # Modules whose exam cannot fit in any day are reported on their own
+        day_length = self.day_end - minutes(available_slots[0]) if available_slots else 0
+        invalid = [
+            module_id for module_id in unscheduled
+            if not 0 < model.module_duration.get(module_id, DEFAULT_DURATION) <= day_length
+        ]
+        for module_id in invalid:
+            duration = model.module_duration.get(module_id, DEFAULT_DURATION)
+            conflicts.append({
+                "type": "invalid_duration",
+                "module_id": module_id,
+                "duree": duration,
+                "message": f"Module {model.module_names.get(module_id) or module_id} has an exam duration of "
+                           f"{duration} minutes, which does not fit in a {day_length}-minute exam day"
+            })
+        if len(unscheduled) > len(invalid):
+            conflicts.append({
+                "type": "date_range",
+                "message": f"Not enough days to schedule all exams. {len(unscheduled) - len(invalid)} modules remaining."
+            })
+        
+        self._report_progress(90, len(new_exams))
+        
+        if dry_run:
+            # Preview: the database is only read, never written or locked
+            with profiler.phase("detect_conflicts"):
+                conflicts.extend(self._detect_conflicts(state, start_date, end_date))
+            result = {
+                "generated_exams": len(new_exams),
+                "conflicts": conflicts,
+                "success": not unscheduled,
+                "unscheduled_modules": len(unscheduled),
+                "exams": self._describe_exams(new_exams)
+            }
+            if self.exact_report is not None:
+                result["exact"] = self.exact_report
+            return result
+        
+        # Write the new timetable back in a single transaction
+        self._persist(new_exams, start_date, end_date)
+        
+        # Check for conflicts after generation
+        with profiler.phase("detect_conflicts"):
+            conflicts.extend(self._detect_conflicts(state, start_date, end_date))
+        
+        with profiler.phase("commit"):
+            self.db.commit()
+        
+        result = {
+            "generated_exams": len(new_exams),
+            "conflicts": conflicts,
+            "success": not unscheduled,
+            "unscheduled_modules": len(unscheduled)
+        }
+        if self.exact_report is not None:
+            result["exact"] = self.exact_report
+        return result
+    
+    def repair_timetable(self, start_date: date, end_date: date, event: str,
+                         module_id: int = None, examen_id: int = None, salle_id: int = None,
+                         prof_id: int = None, dates: List[date] = None,
+                         exam_start_time: time = time(9, 0), exam_end_time: time = time(17, 0),
+                         dry_run: bool = False) -> Dict:
+        """
+        Patch the timetable of a date range after one change (see TimetableRepair)
+        instead of regenerating it:
+        - exam_deleted: `module_id` gets a new exam; `examen_id`, if still there, is deleted
+        - room_unavailable: `salle_id` is out of service on `dates` (default: the whole range)
+        - professor_unavailable: `prof_id` cannot supervise on `dates` (default: the whole range)
+        Only the exams touched are written. Exams that keep their date and time keep
+        their approvals; moved ones go back to pending.
+        """
+        if event not in TimetableRepair.EVENTS:
+            raise ValueError(f"Unknown repair event: {event}")
         
-        # Group modules by formation to optimize scheduling
-        current_date = start_date
+        if self.model is None:
+            self.model = model_cache.get(self.db)
+        model = self.model
+        
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        days_affected = [d for d in days if d in dates] if dates else days
         available_slots = self._generate_time_slots(exam_start_time, exam_end_time)
+        self.day_end = minutes(exam_end_time)
+        
+        state = ScheduleState(model)
+        for exam in model.exams:
+            state.place(exam)
+        repair = TimetableRepair(self, state, days, available_slots)
+        
+        if event == "exam_deleted":
+            if examen_id is not None:
+                deleted = next((exam for exam in model.exams if exam["id"] == examen_id), None)
+                if deleted is None:
+                    raise ValueError(f"Exam {examen_id} not found")
+                module_id = deleted["module_id"]
+            if module_id not in model.module_formation:
+                raise ValueError(f"Module {module_id} not found")
+            if any(exam["module_id"] == module_id and exam.get("id") != examen_id
+                   for exam in state.exams.values() if start_date <= exam["date"] <= end_date):
+                raise ValueError(f"Module {module_id} already has an exam in the date range")
+            repair.exam_deleted(module_id, examen_id)
+        elif event == "room_unavailable":
+            if salle_id not in model.room_names:
+                raise ValueError(f"Room {salle_id} not found")
+            repair.room_unavailable(salle_id, days_affected)
+        else:
+            if prof_id not in model.professor_names:
+                raise ValueError(f"Professor {prof_id} not found")
+            repair.professor_unavailable(prof_id, days_affected)
+        
+        if not dry_run:
+            self._persist_changes(repair.changes)
+            self.db.commit()
+        
+        conflicts = self._detect_conflicts(state, start_date, end_date)
+        for failed_id in repair.failed:
+            conflicts.append({
+                "type": "repair_failed",
+                "module_id": failed_id,
+                "message": f"No valid slot left for module {model.module_names.get(failed_id) or failed_id}"
+            })
+        
+        return {
+            "changes": [self._describe_change(old, new) for old, new in repair.changes],
+            "conflicts": conflicts,
+            "success": not repair.failed
+        }
+    
+    def _describe_change(self, old: Dict, new: Dict) -> Dict:
+        if new is None:
+            action = "deleted"
+        elif old is None:
+            action = "created"
+        elif (old["date"], old["heure"]) != (new["date"], new["heure"]):
+            action = "moved"
+        else:
+            action = "reassigned"
+        return {
+            "action": action,
+            "examen_id": (new or old).get("id"),
+            "before": self._describe_exams([old])[0] if old else None,
+            "after": self._describe_exams([new])[0] if new else None,
+        }
+    
+    def _describe_exams(self, exams: List[Dict]) -> List[Dict]:
+        """Readable version of planned exams, in date and time order"""
+        model = self.model
+        return [
+            {
+                "module_id": exam["module_id"],
+                "module": model.module_names.get(exam["module_id"]),
+                "date": str(exam["date"]),
+                "heure": str(exam["heure"]),
+                "duree": exam["duree"],
+                "salles": [{"id": room_id, "nom": model.room_names.get(room_id)} for room_id in exam["salle_ids"]],
+                "professeurs": [{"id": prof_id, "nom": model.professor_names.get(prof_id)} for prof_id in exam["prof_ids"]],
+            }
+            for exam in sorted(exams, key=lambda e: (e["date"], e["heure"], e["module_id"]))
+        ]
+    
+    def _report_progress(self, percent: float, modules_scheduled: int):
+        if self.progress is not None:
+            total = len(self.scope) if self.scope is not None else len(self.model.module_ids)
+            self.progress(percent, modules_scheduled, total)
+    
+    def _initial_state(self, start_date: date, end_date: date) -> ScheduleState:
+        """Schedule state holding the existing exams that are not replaced"""
+        # Exams outside the date range are kept, the ones inside are replaced
+        # (only those of the scoped modules in a department run)
+        state = ScheduleState(self.model)
+        for exam in self.model.exams:
+            if not (start_date <= exam["date"] <= end_date) or (
+                self.scope is not None and exam["module_id"] not in self.scope
+            ):
+                state.place(exam)
+        return state
+    
+    def _solve(self, start_date: date, end_date: date, available_slots: List[time],
+               strategy: str, module_order: List[int]) -> Tuple[ScheduleState, List[Dict], List[int]]:
+        """Run one scheduling engine in memory over the date range"""
+        state = self._initial_state(start_date, end_date)
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        schedule = getattr(self, f"_schedule_{strategy}")
+        new_exams, unscheduled = schedule(state, days, available_slots, module_order)
+        return state, new_exams, unscheduled
+    
+    def _solve_multi_start(self, start_date: date, end_date: date, available_slots: List[time],
+                           strategy: str, restarts: int,
+                           seed: int) -> Tuple[ScheduleState, List[Dict], List[int]]:
+        """
+        Run the engine on `restarts` module orderings spread over all cores and keep
+        the best result (see _score). Run 0 uses the database order; ties go to the
+        lowest run number, so the outcome only depends on the data and `seed`.
+        """
+        if self.model.snapshot_path:
+            # Workers map the snapshot file themselves instead of receiving a copy
+            shipped = self.model.snapshot_path
+        else:
+            # Build the conflict matrix once so workers receive it with the model
+            self.model.conflict_graph
+            shipped = self.model
+        
+        workers = min(restarts, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shipped,)) as pool:
+            results = []
+            for result in pool.map(
+                _run_restart,
+                [(start_date, end_date, available_slots, self.day_end, self.scope, strategy, seed, run)
+                 for run in range(restarts)]
+            ):
+                results.append(result)
+                self._report_progress(5 + 75 * len(results) / restarts, None)
+        
+        score, run, new_exams, unscheduled = min(results, key=lambda r: (r[0], r[1]))
+        
+        # Rebuild the winning state locally
+        state = self._initial_state(start_date, end_date)
+        for exam in new_exams:
+            state.place(exam)
+        return state, new_exams, unscheduled
+    
+    def _solve_decomposed(self, start_date: date, end_date: date, available_slots: List[time],
+                          strategy: str) -> Tuple[ScheduleState, List[Dict], List[int]]:
+        """
+        Solve independent parts of the problem in parallel worker processes.
+        Connected components of the student/formation conflict graph are packed into
+        one group per core; each group gets a quota of rooms and professors (see
+        _partition_resources) so the partial timetables cannot collide when merged.
+        Modules a group could not place are retried afterwards with every resource.
+        """
+        model = self.model
+        workers = os.cpu_count() or 1
+        components = model.components()
+        if len(components) < 2 or workers < 2:
+            return self._solve(start_date, end_date, available_slots, strategy, model.module_ids)
+        
+        # Largest components first, each into the group with the fewest modules
+        groups: List[List[int]] = [[] for _ in range(min(workers, len(components)))]
+        for component in components:
+            min(groups, key=len).extend(component)
+        
+        room_quotas, prof_quotas = self._partition_resources(groups)
+        tasks = [
+            (model.subset(group, room_quotas[i], prof_quotas[i]), start_date, end_date, available_slots,
+             self.day_end, strategy)
+            for i, group in enumerate(groups)
+        ]
+        
+        state = self._initial_state(start_date, end_date)
+        new_exams = []
+        unscheduled = []
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            for done, (group_exams, group_unscheduled) in enumerate(pool.map(_run_group, tasks), start=1):
+                for exam in group_exams:
+                    state.place(exam)
+                new_exams.extend(group_exams)
+                unscheduled.extend(group_unscheduled)
+                self._report_progress(5 + 70 * done / len(groups), len(new_exams))
+        
+        # Repair: the quotas may have been too tight for some modules
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        placed, unscheduled = self._place_modules(state, days, available_slots, unscheduled)
+        new_exams.extend(placed)
+        
+        order = {module_id: i for i, module_id in enumerate(model.module_ids)}
+        unscheduled.sort(key=lambda module_id: order[module_id])
+        return state, new_exams, unscheduled
+    
+    def _partition_resources(self, groups: List[List[int]]) -> Tuple[List[set], List[set]]:
+        """
+        Share rooms and professors between module groups in proportion to their needs.
+        Rooms follow the number of room bookings a group needs; every group first gets
+        enough rooms for its largest exam. Professors follow the number of exams and
+        go to groups of their own department when possible. Every group has at least
+        two professors.
+        """
+        model = self.model
+        
+        def rooms_needed(module_id):
+            return sum(-(-count // 20) for _, count in model.students_by_formation[module_id])
+        
+        room_demand = [sum(rooms_needed(m) for m in group) for group in groups]
+        largest_exam = [max((rooms_needed(m) for m in group), default=0) for group in groups]
+        exam_counts = [sum(1 for m in group if model.students_by_formation[m]) for group in groups]
+        
+        def neediest(candidates, assigned, demand, total):
+            # Group furthest below its proportional share
+            return max(candidates, key=lambda i: demand[i] * total / max(sum(demand), 1) - len(assigned[i]))
+        
+        # Rooms, best first
+        rooms = [room[2] for room in reversed(model.room_fit_order)]
+        room_quotas = [set() for _ in groups]
+        position = 0
+        for i in sorted(range(len(groups)), key=lambda i: -largest_exam[i]):
+            for room_id in rooms[position:position + largest_exam[i]]:
+                room_quotas[i].add(room_id)
+            position += largest_exam[i]
+        for room_id in rooms[position:]:
+            room_quotas[neediest(range(len(groups)), room_quotas, room_demand, len(rooms))].add(room_id)
+        
+        # Professors, by department
+        depts_of_group = [{model.module_dept(m) for m in group} for group in groups]
+        prof_quotas = [set() for _ in groups]
+        for prof_id, dept_id in model.professors:
+            candidates = [i for i in range(len(groups)) if dept_id in depts_of_group[i]] or range(len(groups))
+            prof_quotas[neediest(candidates, prof_quotas, exam_counts, len(model.professors))].add(prof_id)
+        for i in range(len(groups)):
+            while len(prof_quotas[i]) < 2:
+                donor = max(range(len(groups)), key=lambda j: len(prof_quotas[j]))
+                if donor == i or len(prof_quotas[donor]) <= 2:
+                    break
+                prof_quotas[i].add(prof_quotas[donor].pop())
+        
+        return room_quotas, prof_quotas
+    
+    def _place_modules(self, state: ScheduleState, days: List[date], available_slots: List[time],
+                       module_ids: List[int]) -> Tuple[List[Dict], List[int]]:
+        """Place each module on the earliest day and slot that fits; return placed exams and leftovers"""
+        model = self.model
+        placed = []
+        leftovers = []
+        for module_id in module_ids:
+            exam = None
+            for current_date in days:
+                if self._check_formation_conflict(state, model.module_formation[module_id], current_date, module_id):
+                    continue
+                if self._check_student_conflicts(state, module_id, current_date, None):
+                    continue
+                for slot in available_slots:
+                    exam = self._try_slot(state, module_id, current_date, slot)
+                    if exam is not None:
+                        break
+                if exam is not None:
+                    break
+            if exam is None:
+                leftovers.append(module_id)
+            else:
+                state.place(exam)
+                placed.append(exam)
+        return placed, leftovers
+    
+    def _module_order(self, seed: int, run: int) -> List[int]:
+        """Module ordering for one restart (run 0 keeps the database order), within the scope"""
+        order = [module_id for module_id in self.model.module_ids if self.scope is None or module_id in self.scope]
+        if run > 0:
+            random.Random(f"{seed}:{run}").shuffle(order)
+        return order
+    
+    def _score(self, new_exams: List[Dict], unscheduled: List[int]) -> Tuple[int, int, float]:
+        """
+        Rank a timetable, lower is better: unscheduled modules, then exam days
+        used, then variance of the number of supervisions per professor.
+        """
+        loads = {prof_id: 0 for prof_id, _ in self.model.professors}
+        for exam in new_exams:
+            for prof_id in exam["prof_ids"]:
+                loads[prof_id] = loads.get(prof_id, 0) + 1
+        mean = sum(loads.values()) / len(loads) if loads else 0
+        variance = sum((load - mean) ** 2 for load in loads.values()) / len(loads) if loads else 0
+        days_used = len({exam["date"] for exam in new_exams})
+        return len(unscheduled), days_used, round(variance, 6)
+    
+    def _schedule_greedy(self, state: ScheduleState, days: List[date], available_slots: List[time],
+                         module_order: List[int]) -> Tuple[List[Dict], List[int]]:
+        """
+        Walk the modules in the given order, day by day, and give each one the first
+        slot that fits. Only one exam is held per slot on a given day.
+        Returns the new exams and the ids of the modules left unscheduled.
+        """
+        model = self.model
         scheduled_modules = set()
+        modules = module_order
+        new_exams = []
         
         # First pass: Schedule all modules
-        while len(scheduled_modules) < len(modules):
-            if current_date > end_date:
-                conflicts.append({
-                    "type": "date_range",
-                    "message": f"Not enough days to schedule all exams. {len(modules) - len(scheduled_modules)} modules remaining."
-                })
+        for current_date in days:
+            if len(scheduled_modules) >= len(modules):
                 break
                 
             used_slots_today = []
             
-            for module in modules:
-                if module.id in scheduled_modules:
+            for module_id in modules:
+                if module_id in scheduled_modules:
                     continue
                     
                 # Check if another module from the same formation already has an exam today
-                if self._check_formation_conflict(module.formation_id, current_date, module.id):
+                if self._check_formation_conflict(state, model.module_formation[module_id], current_date, module_id):
                     continue
                     
-                # Get students enrolled in this module, grouped by formation
+                # Students enrolled in this module, grouped by formation
                 # Students from the same formation should take the exam together
-                students_by_formation = self.db.query(
-                    Etudiant.formation_id,
-                    func.count(Etudiant.id).label('student_count')
-                ).join(
-                    inscriptions, Etudiant.id == inscriptions.c.etudiant_id
-                ).filter(
-                    inscriptions.c.module_id == module.id
-                ).group_by(Etudiant.formation_id).all()
-                
-                if not students_by_formation:
-                    scheduled_modules.add(module.id)
+                if not model.students_by_formation[module_id]:
+                    scheduled_modules.add(module_id)
                     continue
                 
                 # Try to find available slot and rooms
-                exam_scheduled = False
                 for slot in available_slots:
                     if slot in used_slots_today:
                         continue
                     
-                    # Check if any student in this module already has an exam at this time
-                    has_conflict = self._check_student_conflicts(module.id, current_date, slot)
-                    if has_conflict:
-                        continue
-                    
-                    # Find rooms to accommodate all students, ensuring same formation students are together
-                    # Calculate total students and verify we can group by formation
-                    total_students = sum(formation[1] for formation in students_by_formation)
-                    required_rooms = self._find_rooms_for_students_by_formation(
-                        students_by_formation, rooms, current_date, slot
-                    )
-                    if not required_rooms:
+                    # Check if any student in this module already has an exam on this day
+                    if self._check_student_conflicts(state, module_id, current_date, slot):
                         continue
                     
-                    # Assign professors
-                    assigned_profs = self._assign_professors(module, current_date, slot, professors)
-                    if not assigned_profs:
+                    exam = self._try_slot(state, module_id, current_date, slot)
+                    if exam is None:
                         continue
                     
-                    # Create exam (initially pending approval)
-                    exam = Examen(
-                        module_id=module.id,
-                        date=current_date,
-                        heure=slot,
-                        duree=120,  # Default 2 hours
-                        dept_head_approved=0,  # Pending Department Head approval
-                        vice_dean_approved=0   # Pending Vice-Dean approval
-                    )
-                    self.db.add(exam)
-                    self.db.flush()
-                    
-                    # Associate rooms
-                    for room_id in required_rooms:
-                        self.db.execute(
-                            examens_salles.insert().values(examen_id=exam.id, salle_id=room_id)
-                        )
-                    
-                    # Associate professors
-                    for prof_id in assigned_profs:
-                        self.db.execute(
-                            surveillances.insert().values(examen_id=exam.id, prof_id=prof_id)
-                        )
-                    
-                    generated_exams.append(exam.id)
-                    scheduled_modules.add(module.id)
+                    state.place(exam)
+                    new_exams.append(exam)
+                    self._report_progress(5 + 75 * len(scheduled_modules) / max(len(modules), 1), len(new_exams))
+                    scheduled_modules.add(module_id)
                     used_slots_today.append(slot)
-                    exam_scheduled = True
                     break
-                
-                if not exam_scheduled:
-                    # Try next day
-                    pass
+        
+        unscheduled = [module_id for module_id in modules if module_id not in scheduled_modules]
+        return new_exams, unscheduled
+    
+    def _schedule_dsatur(self, state: ScheduleState, days: List[date], available_slots: List[time],
+                         module_order: List[int]) -> Tuple[List[Dict], List[int]]:
+        """
+        Graph-colouring engine (DSatur). Modules that share a student or a formation
+        cannot sit on the same day, so days are colours of that conflict graph.
+        The uncoloured module whose neighbours already use the most distinct days
+        (ties: most neighbours) is placed next, on the earliest day with a slot that
+        has enough rooms and supervisors. Several exams may share a slot.
+        Remaining ties are broken by position in `module_order`.
+        Returns the new exams and the ids of the modules left unscheduled.
+        """
+        model = self.model
+        graph = model.conflict_graph
+        
+        # Modules without students need no exam, like in the greedy pass
+        modules = [module_id for module_id in module_order if model.students_by_formation[module_id]]
+        
+        neighbours = self._day_neighbours(modules)
+        degree = {module_id: bin(neighbours[module_id]).count("1") for module_id in modules}
+        
+        # Days already used by each module's neighbours, as a bitset over day indexes
+        used_days: Dict[int, int] = {module_id: 0 for module_id in modules}
+        
+        order = {module_id: i for i, module_id in enumerate(modules)}
+        heap = [(0, -degree[module_id], order[module_id], module_id) for module_id in modules]
+        heapq.heapify(heap)
+        
+        new_exams = []
+        unscheduled = []
+        pending = set(modules)
+        while heap:
+            neg_saturation, _, _, module_id = heapq.heappop(heap)
+            if module_id not in pending:
+                continue
+            saturation = bin(used_days[module_id]).count("1")
+            if -neg_saturation != saturation:
+                continue  # Stale entry, a fresher one is in the heap
+            pending.discard(module_id)
+            
+            exam = None
+            for day_index, current_date in enumerate(days):
+                if used_days[module_id] >> day_index & 1:
+                    continue
+                if self._check_formation_conflict(state, model.module_formation[module_id], current_date, module_id):
+                    continue
+                if self._check_student_conflicts(state, module_id, current_date, None):
+                    continue
+                for slot in available_slots:
+                    exam = self._try_slot(state, module_id, current_date, slot)
+                    if exam is not None:
+                        break
+                if exam is not None:
+                    break
+            
+            if exam is None:
+                unscheduled.append(module_id)
+                continue
+            
+            state.place(exam)
+            new_exams.append(exam)
+            self._report_progress(5 + 75 * (len(modules) - len(pending)) / len(modules), len(new_exams))
             
-            # Move to next day
-            current_date += timedelta(days=1)
+            # Raise the saturation of the neighbours still waiting
+            day_bit = 1 << day_index
+            remaining = neighbours[module_id]
+            while remaining:
+                low = remaining & -remaining
+                neighbour_id = graph.module_ids[low.bit_length() - 1]
+                remaining ^= low
+                if neighbour_id in pending and not used_days[neighbour_id] & day_bit:
+                    used_days[neighbour_id] |= day_bit
+                    heapq.heappush(heap, (
+                        -bin(used_days[neighbour_id]).count("1"),
+                        -degree[neighbour_id], order[neighbour_id], neighbour_id
+                    ))
         
-        # Check for conflicts after generation
-        conflicts.extend(self._detect_conflicts(start_date, end_date))
+        # Report in the requested order
+        unscheduled.sort(key=lambda module_id: order[module_id])
+        return new_exams, unscheduled
+    
+    def _schedule_exact(self, state: ScheduleState, days: List[date], available_slots: List[time],
+                        module_order: List[int]) -> Tuple[List[Dict], List[int]]:
+        """
+        Exact engine for small problems (a department, a catch-up session).
+        DSatur gives a first timetable, then a branch and bound over the day-conflict
+        graph (see ExactColouring) looks for one with fewer days, placing each
+        colouring it finds with the usual room and supervisor rules. When the search
+        hits its node or time limit the best timetable found so far is kept, so the
+        result is never worse than DSatur. The outcome, including whether the day
+        count is proven minimal, is kept in `exact_report`. When no timetable fits
+        the date range, it is reported as infeasible with the number of modules left
+        over, and nothing is claimed about the day count.
+        """
+        model = self.model
+        modules = [module_id for module_id in module_order if model.students_by_formation[module_id]]
+        
+        # Incumbent: DSatur on a copy of the state
+        incumbent_state = self._copy_state(state)
+        new_exams, unscheduled = self._schedule_dsatur(incumbent_state, days, available_slots, module_order)
+        upper_bound = len(days) + 1 if unscheduled else len({exam["date"] for exam in new_exams})
+        
+        # Daily budgets: room-minutes and supervisions (2 per exam, 3 per professor)
+        rooms = [room_id for _, _, room_id in model.room_fit_order]
+        day_length = self.day_end - minutes(available_slots[0]) if available_slots else 0
+        capacity = (len(rooms) * day_length, 3 * len(model.professors))
+        need = {
+            module_id: (
+                sum(-(-count // 20) for _, count in model.students_by_formation[module_id])
+                * model.module_duration.get(module_id, DEFAULT_DURATION),
+                2,
+            )
+            for module_id in modules
+        }
+        
+        realised: List[List[Dict]] = []
+        
+        def accept(colouring: List[int]) -> bool:
+            # Place the colouring day by day, largest exams first
+            trial = self._copy_state(state)
+            by_day: Dict[int, List[int]] = defaultdict(list)
+            for module_id, day_index in zip(modules, colouring):
+                by_day[day_index].append(module_id)
+            exams = []
+            for day_index, day_modules in sorted(by_day.items()):
+                day_modules.sort(key=lambda module_id: -need[module_id][0])
+                for module_id in day_modules:
+                    # Kept exams (other departments) are not part of the colouring
+                    if self._check_student_conflicts(trial, module_id, days[day_index], None):
+                        return False
+                    exam = None
+                    for slot in available_slots:
+                        exam = self._try_slot(trial, module_id, days[day_index], slot)
+                        if exam is not None:
+                            break
+                    if exam is None:
+                        return False
+                    trial.place(exam)
+                    exams.append(exam)
+            realised.append(exams)
+            return True
         
-        self.db.commit()
+        graph = model.conflict_graph
+        search = ExactColouring(
+            modules, self._day_neighbours(modules), {m: graph.bit(m) for m in modules}, need, capacity
+        )
+        report = search.solve(upper_bound, accept, feasible=not unscheduled)
+        if realised:
+            new_exams, unscheduled = realised[-1], []
+        report["improved"] = bool(realised)
+        report["infeasible"] = bool(unscheduled)
+        if unscheduled:
+            # The date range is too short: no day count to report, let alone prove
+            report["days"] = None
+            report["unscheduled"] = len(unscheduled)
+        else:
+            report["days"] = len({exam["date"] for exam in new_exams})
+        self.exact_report = report
+        
+        for exam in new_exams:
+            state.place(exam)
+        self._report_progress(80, len(new_exams))
+        return new_exams, unscheduled
+    
+    def _day_neighbours(self, modules: List[int]) -> Dict[int, int]:
+        """
+        Day-conflict bitset (over conflict graph indexes) of each module: modules
+        sharing a student or the formation, which cannot sit on the same day.
+        """
+        model = self.model
+        graph = model.conflict_graph
+        formation_bits: Dict[int, int] = {}
+        for module_id in modules:
+            formation_id = model.module_formation[module_id]
+            formation_bits[formation_id] = formation_bits.get(formation_id, 0) | graph.bit(module_id)
+        neighbours: Dict[int, int] = {}
+        for module_id in modules:
+            bit = graph.bit(module_id)
+            neighbours[module_id] = (
+                graph.masks[graph.index[module_id]] | formation_bits[model.module_formation[module_id]]
+            ) & ~bit
+        return neighbours
+    
+    def _copy_state(self, state: ScheduleState) -> ScheduleState:
+        """Independent schedule state holding the same exams"""
+        copy = ScheduleState(self.model)
+        for exam in state.exams.values():
+            copy.place(exam)
+        return copy
+    
+    def _try_slot(self, state: ScheduleState, module_id: int, exam_date: date,
+                  slot: time) -> Dict:
+        """Find rooms and supervisors for a module at a given slot, or return None"""
+        duration = self.model.module_duration.get(module_id, DEFAULT_DURATION)
+        if duration <= 0 or minutes(slot) + duration > self.day_end:
+            return None
         
+        # Find rooms to accommodate all students, ensuring same formation students are together
+        required_rooms = self._find_rooms_for_students_by_formation(
+            state, self.model.students_by_formation[module_id], exam_date, slot, duration
+        )
+        if not required_rooms:
+            return None
+        
+        # Assign professors
+        assigned_profs = self._assign_professors(state, module_id, exam_date, slot)
+        if not assigned_profs:
+            return None
+        
+        # Create exam (initially pending approval)
         return {
-            "generated_exams": len(generated_exams),
-            "conflicts": conflicts,
-            "success": len(scheduled_modules) == len(modules)
+            "module_id": module_id,
+            "date": exam_date,
+            "heure": slot,
+            "duree": duration,
+            "dept_head_approved": 0,  # Pending Department Head approval
+            "vice_dean_approved": 0,  # Pending Vice-Dean approval
+            "salle_ids": required_rooms,
+            "prof_ids": assigned_profs,
         }
     
+    def _persist(self, new_exams: List[Dict], start_date: date, end_date: date):
+        """
+        Replace the exams of the date range (of the scoped modules, if any) with the generated ones.
+        Ids are allocated in one round trip and rows are written with one
+        multi-row insert per table instead of one statement per row.
+        """
+        with self.profiler.phase("persist_delete"):
+            replaced = and_(Examen.date >= start_date, Examen.date <= end_date)
+            if self.scope is not None:
+                replaced = and_(replaced, Examen.module_id.in_(self.scope))
+            in_range = select(Examen.id).where(replaced)
+            self.db.execute(examens_salles.delete().where(examens_salles.c.examen_id.in_(in_range)))
+            self.db.execute(surveillances.delete().where(surveillances.c.examen_id.in_(in_range)))
+            self.db.query(Examen).filter(replaced).delete(synchronize_session=False)
+            bump_version(self.db, EXAMENS)
+        
+        if not new_exams:
+            return
+        
+        with self.profiler.phase("persist_insert"):
+            self._insert_exams(new_exams)
+    
+    def _insert_exams(self, new_exams: List[Dict]):
+        """Write new exams with their rooms and supervisors, setting their "id" """
+        for planned, exam_id in zip(new_exams, self._allocate_exam_ids(len(new_exams))):
+            planned["id"] = exam_id
+        
+        self.db.execute(insert(Examen.__table__), [
+            {
+                "id": planned["id"],
+                "module_id": planned["module_id"],
+                "date": planned["date"],
+                "heure": planned["heure"],
+                "duree": planned["duree"],
+                "dept_head_approved": planned["dept_head_approved"],
+                "vice_dean_approved": planned["vice_dean_approved"],
+            }
+            for planned in new_exams
+        ])
+        
+        self._insert_links(new_exams)
+    
+    def _insert_links(self, exams: List[Dict]):
+        """Write the room and supervisor rows of exams that have an id"""
+        # Associate rooms
+        room_rows = [
+            {"examen_id": planned["id"], "salle_id": room_id}
+            for planned in exams for room_id in planned["salle_ids"]
+        ]
+        if room_rows:
+            self.db.execute(examens_salles.insert(), room_rows)
+        
+        # Associate professors
+        prof_rows = [
+            {"examen_id": planned["id"], "prof_id": prof_id}
+            for planned in exams for prof_id in planned["prof_ids"]
+        ]
+        if prof_rows:
+            self.db.execute(surveillances.insert(), prof_rows)
+    
+    def _persist_changes(self, changes: List[Tuple[Dict, Dict]]):
+        """Write the exams touched by a repair, leaving every other row alone"""
+        deleted_ids = [old["id"] for old, new in changes if new is None]
+        updated = [new for old, new in changes if old is not None and new is not None]
+        created = [new for old, new in changes if old is None]
+        
+        if changes:
+            bump_version(self.db, EXAMENS)
+        touched_ids = deleted_ids + [exam["id"] for exam in updated]
+        if touched_ids:
+            self.db.execute(examens_salles.delete().where(examens_salles.c.examen_id.in_(touched_ids)))
+            self.db.execute(surveillances.delete().where(surveillances.c.examen_id.in_(touched_ids)))
+        if deleted_ids:
+            self.db.execute(Examen.__table__.delete().where(Examen.id.in_(deleted_ids)))
+        if updated:
+            self.db.execute(
+                update(Examen.__table__).where(Examen.id == bindparam("exam_id")).values(
+                    date=bindparam("date"), heure=bindparam("heure"), duree=bindparam("duree"),
+                    dept_head_approved=bindparam("dept_head_approved"),
+                    vice_dean_approved=bindparam("vice_dean_approved"),
+                ),
+                [
+                    {
+                        "exam_id": exam["id"],
+                        "date": exam["date"],
+                        "heure": exam["heure"],
+                        "duree": exam["duree"],
+                        "dept_head_approved": exam["dept_head_approved"],
+                        "vice_dean_approved": exam["vice_dean_approved"],
+                    }
+                    for exam in updated
+                ]
+            )
+            self._insert_links(updated)
+        if created:
+            self._insert_exams(created)
+    
+    def _allocate_exam_ids(self, count: int) -> List[int]:
+        """Reserve `count` exam ids in a single query"""
+        if self.db.get_bind().dialect.name == "postgresql":
+            return list(self.db.execute(
+                text("SELECT nextval(pg_get_serial_sequence('examens', 'id')) FROM generate_series(1, :n)"),
+                {"n": count}
+            ).scalars())
+        
+        # Other databases have no sequence: continue after the highest id
+        # (the write transaction is still open, so nobody else takes them)
+        current = self.db.query(func.max(Examen.id)).scalar() or 0
+        return list(range(current + 1, current + count + 1))
+    
     def _generate_time_slots(self, start_time: time, end_time: time) -> List[time]:
-        """Generate available time slots for exams"""
+        """
+        Possible exam start times, every SLOT_MINUTES. Exams last as long as their
+        module requires (see _try_slot), so a room or professor is busy for that
+        interval only and can take another exam as soon as it ends.
+        """
         slots = []
-        current = start_time
-        while current < end_time:
-            slots.append(current)
-            # Next slot is 3 hours later (2h exam + 1h break)
-            hour = current.hour + 3
-            if hour >= 24:
-                break
-            current = time(hour, 0)
+        current = minutes(start_time)
+        while current < minutes(end_time):
+            slots.append(time(current // 60, current % 60))
+            current += self.SLOT_MINUTES
         return slots
     
-    def _check_formation_conflict(self, formation_id: int, exam_date: date, exclude_module_id: int = None) -> bool:
+    def _check_formation_conflict(self, state: ScheduleState, formation_id: int, exam_date: date,
+                                  exclude_module_id: int = None) -> bool:
         """Check if any module from the same formation already has an exam on this date"""
-        query = self.db.query(Examen).join(
-            Module, Examen.module_id == Module.id
-        ).filter(
-            and_(
-                Module.formation_id == formation_id,
-                Examen.date == exam_date
-            )
-        )
+        count = state.formations_by_date[exam_date].get(formation_id, 0)
         
         # Exclude the current module if provided (for checking before scheduling)
-        if exclude_module_id:
-            query = query.filter(Module.id != exclude_module_id)
-        
-        conflicting_exam = query.first()
-        return conflicting_exam is not None
+        if exclude_module_id and exclude_module_id in state.modules_by_date[exam_date]:
+            count -= 1
+        return count > 0
     
-    def _check_student_conflicts(self, module_id: int, exam_date: date, exam_time: time) -> bool:
+    def _check_student_conflicts(self, state: ScheduleState, module_id: int, exam_date: date,
+                                 exam_time: time) -> bool:
         """Check if any student in this module already has an exam on this date"""
-        students = self.db.query(inscriptions.c.etudiant_id).filter(
-            inscriptions.c.module_id == module_id
-        ).subquery()
-        
-        conflicting_exams = self.db.query(Examen).join(
-            Module, Examen.module_id == Module.id
-        ).join(
-            inscriptions, Module.id == inscriptions.c.module_id
-        ).filter(
-            and_(
-                inscriptions.c.etudiant_id.in_(students),
-                Examen.date == exam_date
-            )
-        ).first()
-        
-        return conflicting_exams is not None
-    
-    def _find_rooms_for_students(self, student_count: int, rooms: List, 
-                                 exam_date: date, exam_time: time) -> List[int]:
-        """Find available rooms that can accommodate students (max 20 per room)"""
-        # Get already scheduled rooms for this date/time
-        scheduled_rooms = self.db.query(examens_salles.c.salle_id).join(
-            Examen, examens_salles.c.examen_id == Examen.id
-        ).filter(
-            and_(
-                Examen.date == exam_date,
-                Examen.heure == exam_time
-            )
-        ).all()
-        
-        scheduled_room_ids = [r[0] for r in scheduled_rooms]
-        
-        available_rooms = []
-        remaining_students = student_count
-        
-        for room in sorted(rooms, key=lambda x: x.capacite, reverse=True):
-            if room.id in scheduled_room_ids:
-                continue
-            
-            # During exams, max 20 students per room
-            room_capacity = min(room.capacite, 20)
-            if room_capacity > 0:
-                available_rooms.append(room.id)
-                remaining_students -= room_capacity
-                if remaining_students <= 0:
-                    break
-        
-        return available_rooms if remaining_students <= 0 else []
+        # One bitset AND against every module already examined that day
+        return self.model.conflict_graph.clashes(module_id, state.day_masks[exam_date])
     
-    def _find_rooms_for_students_by_formation(self, students_by_formation: List, 
-                                               rooms: List, exam_date: date, 
-                                               exam_time: time) -> List[int]:
+    def _find_rooms_for_students_by_formation(self, state: ScheduleState, students_by_formation: List,
+                                               exam_date: date, exam_time: time,
+                                               duration: int = DEFAULT_DURATION) -> List[int]:
         """
         Find available rooms ensuring students from the same formation are grouped together.
         Students from the same formation will be assigned to the same room(s) together.
         Returns list of room IDs that can accommodate all formation groups.
+
+        Best-fit decreasing: the largest formation group is seated first, each time in
+        the smallest free room that holds what is left of it (max 20 per room during
+        exams), so big rooms are not spent on small groups.
         """
-        # Get already scheduled rooms for this date/time
-        scheduled_rooms = self.db.query(examens_salles.c.salle_id).join(
-            Examen, examens_salles.c.examen_id == Examen.id
-        ).filter(
-            and_(
-                Examen.date == exam_date,
-                Examen.heure == exam_time
-            )
-        ).all()
-        
-        scheduled_room_ids = [r[0] for r in scheduled_rooms]
-        
-        # Sort rooms by capacity (descending) for better allocation
-        available_rooms_list = [
-            room for room in sorted(rooms, key=lambda x: x.capacite, reverse=True)
-            if room.id not in scheduled_room_ids
-        ]
+        # Rooms free for the whole exam, kept sorted by the schedule state
+        free_rooms = state.free_rooms(exam_date, exam_time, duration)
         
         required_rooms = []
-        used_room_indices = set()  # Track which rooms we've used
+        taken = set()  # Rooms already given to a formation of this exam
         
-        # Assign rooms for each formation group
-        # Each formation's students must be grouped together in the same room(s)
-        for formation_id, student_count in students_by_formation:
+        for formation_id, student_count in sorted(students_by_formation, key=lambda x: -x[1]):
             remaining_students = student_count
-            formation_rooms = []
-            
-            # Try to fit all students from this formation together
-            # Priority: fit entire formation in one room if possible, otherwise use multiple rooms
-            for idx, room in enumerate(available_rooms_list):
-                if idx in used_room_indices:
-                    continue  # Room already assigned to another formation
-                
-                # During exams, max 20 students per room
-                room_capacity = min(room.capacite, 20)
+            while remaining_students > 0:
+                # Smallest free room holding the rest of the group, else the largest one left
+                idx = bisect_left(free_rooms, (min(remaining_students, 20),))
+                while idx < len(free_rooms) and free_rooms[idx][2] in taken:
+                    idx += 1
+                if idx == len(free_rooms):
+                    idx = len(free_rooms) - 1
+                    while idx >= 0 and free_rooms[idx][2] in taken:
+                        idx -= 1
+                    if idx < 0:
+                        # Not enough rooms for every formation in this slot
+                        return []
                 
-                if room_capacity > 0 and remaining_students > 0:
-                    # Assign this room to this formation
-                    formation_rooms.append(room.id)
-                    required_rooms.append(room.id)
-                    used_room_indices.add(idx)
-                    
-                    # Update remaining students
-                    if remaining_students <= room_capacity:
-                        # All students from this formation fit in this room
-                        remaining_students = 0
-                        break
-                    else:
-                        # Need more rooms for this formation
-                        remaining_students -= room_capacity
-            
-            # If we couldn't fit all students from this formation, return empty
-            # This ensures we only schedule if all formations can be accommodated
-            if remaining_students > 0:
-                return []
+                room_capacity, _, room_id = free_rooms[idx]
+                required_rooms.append(room_id)
+                taken.add(room_id)
+                remaining_students -= room_capacity
         
         return required_rooms
     
-    def _assign_professors(self, module: Module, exam_date: date, exam_time: time,
-                          professors: List) -> List[int]:
+    def _assign_professors(self, state: ScheduleState, module_id: int, exam_date: date,
+                          exam_time: time) -> List[int]:
         """
         Assign professors to supervise exam (prioritize department professors).
         Constraints:
         - Maximum 3 exams per day per professor
-        - Cannot be assigned to multiple exams at the same time
+        - Cannot be assigned to exams that overlap in time
+        Among eligible professors the least loaded are picked first, which keeps the
+        number of supervisions even (see ScheduleState.pick_professors).
         """
-        assigned = []
         required_supervisors = 2  # At least 2 supervisors per exam
         
-        # Get professors from same department as module's formation
-        dept_professors = [p for p in professors if p.dept_id == module.formation.dept_id]
-        other_professors = [p for p in professors if p.dept_id != module.formation.dept_id]
-        
-        # Prioritize department professors
-        all_professors = dept_professors + other_professors
+        assigned = state.pick_professors(
+            self.model.module_dept(module_id), exam_date, exam_time, required_supervisors,
+            self.model.module_duration.get(module_id, DEFAULT_DURATION)
+        )
+        return assigned if len(assigned) >= required_supervisors else []
+    
+    def _detect_conflicts(self, state: ScheduleState, start_date: date, end_date: date) -> List[Dict]:
+        """
+        Detect all types of conflicts in the timetable of the date range.
+        Works on the in-memory schedule: one pass over the exams fills every
+        counter, and names come from the problem model instead of the database.
+        """
+        model = self.model
+        rooms = dict(model.rooms)
+        exams = sorted(
+            (exam for exam in state.exams.values() if start_date <= exam["date"] <= end_date),
+            key=lambda e: (e["date"], e["heure"], e["module_id"])
+        )
         
-        for prof in all_professors:
-            if len(assigned) >= required_supervisors:
-                break
+        students_by_day: Dict[date, Counter] = defaultdict(Counter)
+        prof_spans: Dict[Tuple[int, date], List[Tuple[int, int, time]]] = defaultdict(list)
+        room_spans: Dict[Tuple[int, date], List[Tuple[int, int, time]]] = defaultdict(list)
+        prof_daily_counts: Counter = Counter()
+        modules_by_formation_day: Dict[Tuple[int, date], List[int]] = defaultdict(list)
+        capacity_conflicts = []
+        for exam in exams:
+            exam_date = exam["date"]
+            module_students = model.module_students.get(exam["module_id"], ())
+            students_by_day[exam_date].update(module_students)
+            start, end = ScheduleState.span(exam)
+            for prof_id in exam["prof_ids"]:
+                prof_spans[(prof_id, exam_date)].append((start, end, exam["heure"]))
+            for room_id in exam["salle_ids"]:
+                room_spans[(room_id, exam_date)].append((start, end, exam["heure"]))
+            prof_daily_counts.update((prof_id, exam_date) for prof_id in exam["prof_ids"])
+            modules_by_formation_day[(model.module_formation.get(exam["module_id"]), exam_date)].append(exam["module_id"])
             
-            # Check if professor already has an exam at this exact time on this day
-            time_conflict = self.db.query(Examen).join(
-                surveillances, Examen.id == surveillances.c.examen_id
-            ).filter(
-                and_(
-                    surveillances.c.prof_id == prof.id,
-                    Examen.date == exam_date,
-                    Examen.heure == exam_time
-                )
-            ).first()
-            
-            if time_conflict:
-                # Professor already has an exam at this time, skip
-                continue
-            
-            # Check if professor already has 3 exams this day (at different times)
-            daily_exams = self.db.query(func.count(surveillances.c.examen_id)).join(
-                Examen, surveillances.c.examen_id == Examen.id
-            ).filter(
-                and_(
-                    surveillances.c.prof_id == prof.id,
-                    Examen.date == exam_date
-                )
-            ).scalar() or 0
-            
-            if daily_exams < 3:
-                assigned.append(prof.id)
+            capacity = sum(min(rooms.get(room_id, 0), 20) for room_id in exam["salle_ids"])
+            if len(module_students) > capacity:
+                capacity_conflicts.append((exam, len(module_students), capacity))
         
-        return assigned if len(assigned) >= required_supervisors else []
-    
-    def _detect_conflicts(self, start_date: date, end_date: date) -> List[Dict]:
-        """Detect all types of conflicts in the generated timetable"""
         conflicts = []
         
         # Check student conflicts (max 1 exam per day)
-        student_conflicts = self.db.query(
-            inscriptions.c.etudiant_id,
-            Examen.date,
-            func.count(Examen.id).label('count')
-        ).join(
-            Examen, inscriptions.c.module_id == Examen.module_id
-        ).filter(
-            and_(Examen.date >= start_date, Examen.date <= end_date)
-        ).group_by(inscriptions.c.etudiant_id, Examen.date).having(
-            func.count(Examen.id) > 1
-        ).all()
-        
-        for conflict in student_conflicts:
-            conflicts.append({
-                "type": "student_conflict",
-                "etudiant_id": conflict[0],
-                "date": str(conflict[1]),
-                "message": f"Student {conflict[0]} has {conflict[2]} exams on {conflict[1]}"
-            })
+        for exam_date, counts in sorted(students_by_day.items()):
+            for etudiant_id, count in sorted(counts.items()):
+                if count > 1:
+                    conflicts.append({
+                        "type": "student_conflict",
+                        "etudiant_id": etudiant_id,
+                        "date": str(exam_date),
+                        "message": f"Student {etudiant_id} has {count} exams on {exam_date}"
+                    })
         
-        # Check professor conflicts (max 3 exams per day, but not at same time)
-        # First check for time conflicts (same professor, same date, same time)
-        prof_time_conflicts = self.db.query(
-            surveillances.c.prof_id,
-            Examen.date,
-            Examen.heure,
-            func.count(Examen.id).label('count')
-        ).join(
-            Examen, surveillances.c.examen_id == Examen.id
-        ).filter(
-            and_(Examen.date >= start_date, Examen.date <= end_date)
-        ).group_by(surveillances.c.prof_id, Examen.date, Examen.heure).having(
-            func.count(Examen.id) > 1
-        ).all()
-        
-        for conflict in prof_time_conflicts:
-            prof = self.db.query(Professeur).filter(Professeur.id == conflict[0]).first()
+        # Check professor conflicts (overlapping exams, then more than 3 exams per day)
+        for prof_id, exam_date, exam_time, count in self._overlaps(prof_spans):
+            prof_name = model.professor_names.get(prof_id)
             conflicts.append({
                 "type": "professor_time_conflict",
-                "prof_id": conflict[0],
-                "prof_name": prof.nom if prof else "Unknown",
-                "date": str(conflict[1]),
-                "time": str(conflict[2]),
-                "exam_count": conflict[3],
-                "message": f"Professor {prof.nom if prof else conflict[0]} has {conflict[3]} exams at {conflict[2]} on {conflict[1]}"
+                "prof_id": prof_id,
+                "prof_name": prof_name or "Unknown",
+                "date": str(exam_date),
+                "time": str(exam_time),
+                "exam_count": count,
+                "message": f"Professor {prof_name or prof_id} has {count} overlapping exams from {exam_time} on {exam_date}"
             })
+        for (prof_id, exam_date), count in sorted(prof_daily_counts.items()):
+            if count > 3:
+                prof_name = model.professor_names.get(prof_id)
+                conflicts.append({
+                    "type": "professor_daily_conflict",
+                    "prof_id": prof_id,
+                    "prof_name": prof_name or "Unknown",
+                    "date": str(exam_date),
+                    "exam_count": count,
+                    "message": f"Professor {prof_name or prof_id} has {count} exams on {exam_date} (max 3 allowed)"
+                })
         
-        # Check for daily limit conflicts (more than 3 exams per day)
-        prof_daily_conflicts = self.db.query(
-            surveillances.c.prof_id,
-            Examen.date,
-            func.count(Examen.id).label('count')
-        ).join(
-            Examen, surveillances.c.examen_id == Examen.id
-        ).filter(
-            and_(Examen.date >= start_date, Examen.date <= end_date)
-        ).group_by(surveillances.c.prof_id, Examen.date).having(
-            func.count(Examen.id) > 3
-        ).all()
-        
-        for conflict in prof_daily_conflicts:
-            prof = self.db.query(Professeur).filter(Professeur.id == conflict[0]).first()
+        # Check room conflicts (overlapping exams in the same room)
+        for room_id, exam_date, exam_time, count in self._overlaps(room_spans):
+            room_name = model.room_names.get(room_id)
             conflicts.append({
-                "type": "professor_daily_conflict",
-                "prof_id": conflict[0],
-                "prof_name": prof.nom if prof else "Unknown",
-                "date": str(conflict[1]),
-                "exam_count": conflict[2],
-                "message": f"Professor {prof.nom if prof else conflict[0]} has {conflict[2]} exams on {conflict[1]} (max 3 allowed)"
+                "type": "room_conflict",
+                "salle_id": room_id,
+                "salle_name": room_name or "Unknown",
+                "date": str(exam_date),
+                "time": str(exam_time),
+                "exam_count": count,
+                "message": f"Room {room_name or room_id} has {count} overlapping exams from {exam_time} on {exam_date}"
             })
         
         # Check room capacity conflicts
-        capacity_conflicts = self.db.query(
-            Examen.id,
-            func.count(inscriptions.c.etudiant_id).label('students'),
-            func.sum(func.least(Salle.capacite, 20)).label('capacity')
-        ).join(
-            examens_salles, Examen.id == examens_salles.c.examen_id
-        ).join(
-            Salle, examens_salles.c.salle_id == Salle.id
-        ).join(
-            Module, Examen.module_id == Module.id
-        ).join(
-            inscriptions, Module.id == inscriptions.c.module_id
-        ).filter(
-            and_(Examen.date >= start_date, Examen.date <= end_date)
-        ).group_by(Examen.id).all()
-        
-        for conflict in capacity_conflicts:
-            if conflict[1] > (conflict[2] or 0):
-                conflicts.append({
-                    "type": "capacity_conflict",
-                    "examen_id": conflict[0],
-                    "students": conflict[1],
-                    "capacity": conflict[2],
-                    "message": f"Exam {conflict[0]} has {conflict[1]} students but only {conflict[2]} capacity"
-                })
-        
-        # Check formation conflicts (same formation exams on same day)
-        # First get formations with multiple exams on same day
-        formation_conflicts_query = self.db.query(
-            Module.formation_id,
-            Examen.date,
-            func.count(Examen.id).label('count')
-        ).join(
-            Examen, Module.id == Examen.module_id
-        ).filter(
-            and_(Examen.date >= start_date, Examen.date <= end_date)
-        ).group_by(Module.formation_id, Examen.date).having(
-            func.count(Examen.id) > 1
-        ).all()
-        
-        for conflict in formation_conflicts_query:
-            formation_id, exam_date, exam_count = conflict
-            formation = self.db.query(Formation).filter(Formation.id == formation_id).first()
-            
-            # Get module names for this formation on this date
-            modules_on_date = self.db.query(Module.nom).join(
-                Examen, Module.id == Examen.module_id
-            ).filter(
-                and_(
-                    Module.formation_id == formation_id,
-                    Examen.date == exam_date
-                )
-            ).all()
-            module_names = ', '.join([m[0] for m in modules_on_date])
-            
+        for exam, students, capacity in capacity_conflicts:
             conflicts.append({
-                "type": "formation_conflict",
-                "formation_id": formation_id,
-                "formation_name": formation.nom if formation else "Unknown",
-                "date": str(exam_date),
-                "exam_count": exam_count,
-                "modules": module_names,
-                "message": f"Formation {formation.nom if formation else formation_id} has {exam_count} exams on {exam_date}: {module_names}"
+                "type": "capacity_conflict",
+                "examen_id": exam.get("id"),
+                "students": students,
+                "capacity": capacity,
+                "message": f"Exam {exam.get('id', model.module_names.get(exam['module_id']))} has {students} students but only {capacity} capacity"
             })
         
+        # Check formation conflicts (same formation exams on same day)
+        for (formation_id, exam_date), module_ids in modules_by_formation_day.items():
+            if len(module_ids) > 1:
+                formation_name = model.formation_names.get(formation_id)
+                module_names = ', '.join(model.module_names.get(module_id) or "" for module_id in module_ids)
+                conflicts.append({
+                    "type": "formation_conflict",
+                    "formation_id": formation_id,
+                    "formation_name": formation_name or "Unknown",
+                    "date": str(exam_date),
+                    "exam_count": len(module_ids),
+                    "modules": module_names,
+                    "message": f"Formation {formation_name or formation_id} has {len(module_ids)} exams on {exam_date}: {module_names}"
+                })
+        
         return conflicts
+
+    @staticmethod
+    def _overlaps(spans: Dict[Tuple[int, date], List[Tuple[int, int, time]]]) -> List[Tuple]:
+        """
+        (key, date, start time, exam count) for every group of overlapping
+        intervals of a resource on a day; `spans` holds (start, end, heure) lists.
+        """
+        found = []
+        for (key, exam_date), intervals in sorted(spans.items()):
+            if len(intervals) < 2:
+                continue
+            intervals.sort()
+            group_start, group_end, count = intervals[0][2], intervals[0][1], 1
+            for start, end, heure in intervals[1:]:
+                if start < group_end:
+                    count += 1
+                    group_end = max(group_end, end)
+                    continue
+                if count > 1:
+                    found.append((key, exam_date, group_start, count))
+                group_start, group_end, count = heure, end, 1
+            if count > 1:
+                found.append((key, exam_date, group_start, count))
+        return found
+
+# ==================== PROCESS POOL WORKERS ====================
+# Module-level so ProcessPoolExecutor can pickle them. For multi-start the
+# problem model is shipped once per worker process instead of once per run;
+# decomposed groups each receive their own smaller model.
+_worker_model = None
+
+def _init_worker(model):
+    """Receive the problem model, or the path of a snapshot to load it from"""
+    global _worker_model
+    if isinstance(model, str):
+        model = load_snapshot(model)
+    _worker_model = model
+
+def _run_restart(args: Tuple) -> Tuple:
+    start_date, end_date, available_slots, day_end, scope, strategy, seed, run = args
+    generator = TimetableGenerator(None, _worker_model)
+    generator.day_end = day_end
+    generator.scope = scope
+    _, new_exams, unscheduled = generator._solve(
+        start_date, end_date, available_slots, strategy, generator._module_order(seed, run)
+    )
+    return generator._score(new_exams, unscheduled), run, new_exams, unscheduled
+
+def _run_group(args: Tuple) -> Tuple:
+    model, start_date, end_date, available_slots, day_end, strategy = args
+    generator = TimetableGenerator(None, model)
+    generator.day_end = day_end
+    _, new_exams, unscheduled = generator._solve(
+        start_date, end_date, available_slots, strategy, model.module_ids
+    )
+    return new_exams, unscheduled
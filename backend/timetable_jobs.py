@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional
+import os
+import threading
+import uuid
+
+# Number of timetable generations allowed to run at the same time
+JOB_WORKERS = int(os.getenv("TIMETABLE_JOB_WORKERS", "2"))
+
+# Finished jobs kept in memory so clients can still read their result
+MAX_FINISHED_JOBS = 100
+
+class JobManager:
+    """
+    Runs long timetable generations in a background worker pool.
+    Jobs are plain dicts (see _new_job) read by the polling endpoint; a job
+    submitted with the same key as a queued or running one attaches to it.
+    """
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="timetable-job")
+        self.jobs: Dict[str, Dict] = {}
+        self.active_by_key: Dict[Hashable, str] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, key: Hashable, run: Callable[[Callable], object], **info) -> Dict:
+        """
+        Queue `run(progress)` unless a job with the same key is still active.
+        `run` receives a progress(percent, modules_scheduled, total_modules)
+        callback and returns the job result.
+        """
+        with self.lock:
+            job_id = self.active_by_key.get(key)
+            if job_id is not None:
+                return dict(self.jobs[job_id])
+
+            job = self._new_job(info)
+            self.jobs[job["id"]] = job
+            self.active_by_key[key] = job["id"]
+            self._forget_old_jobs()
+
+        self.executor.submit(self._run, job["id"], key, run)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _new_job(self, info: Dict) -> Dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",  # queued -> running -> completed / failed
+            "percent": 0.0,
+            "modules_scheduled": 0,
+            "total_modules": 0,
+            "created_at": datetime.utcnow(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        job.update(info)
+        return job
+
+    def _update(self, job_id: str, **changes):
+        with self.lock:
+            self.jobs[job_id].update(changes)
+
+    def _run(self, job_id: str, key: Hashable, run: Callable):
+        self._update(job_id, status="running")
+
+        def progress(percent: float, modules_scheduled: int = None, total_modules: int = None):
+            changes = {"percent": round(min(percent, 100.0), 1)}
+            if modules_scheduled is not None:
+                changes["modules_scheduled"] = modules_scheduled
+            if total_modules is not None:
+                changes["total_modules"] = total_modules
+            self._update(job_id, **changes)
+
+        try:
+            result = run(progress)
+            self._update(job_id, status="completed", percent=100.0, result=result,
+                         finished_at=datetime.utcnow())
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+        finally:
+            with self.lock:
+                if self.active_by_key.get(key) == job_id:
+                    del self.active_by_key[key]
+
+    def _forget_old_jobs(self):
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS (lock held)"""
+        finished = [job for job in self.jobs.values() if job["finished_at"] is not None]
+        if len(finished) <= MAX_FINISHED_JOBS:
+            return
+        finished.sort(key=lambda job: job["finished_at"])
+        for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+            del self.jobs[job["id"]]
+
+
+job_manager = JobManager()
@@ -0,0 +1,566 @@
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from bisect import bisect_left, insort
+from heapq import heapify, heappop, heappush
+from datetime import date, time
+from typing import List, Dict, Tuple, Set
+import threading
+from models import Examen, Module, Etudiant, Professeur, Salle, Formation, inscriptions, surveillances, examens_salles
+from versions import CATALOGUE, get_versions
+
+# Exam length in minutes for modules that do not set one
+DEFAULT_DURATION = 120
+# Longest exam accepted: the whole default exam day (9:00 to 17:00)
+MAX_DURATION = 8 * 60
+
+
+def minutes(moment: time) -> int:
+    """Minutes since midnight"""
+    return moment.hour * 60 + moment.minute
+
+
+class ProblemModel:
+    """
+    In-memory copy of everything the timetable generator needs.
+    Loaded once with a fixed number of queries and indexed by id, so the
+    scheduling search never has to go back to the database.
+    """
+    def __init__(self):
+        # Modules in database order
+        self.module_ids: List[int] = []
+        self.module_names: Dict[int, str] = {}
+        self.module_formation: Dict[int, int] = {}
+        # Exam length of each module in minutes
+        self.module_duration: Dict[int, int] = {}
+
+        # Formations and their department
+        self.formation_names: Dict[int, str] = {}
+        self.formation_dept: Dict[int, int] = {}
+
+        # Enrolled students per module, and their count grouped by the student's formation
+        self.module_students: Dict[int, List[int]] = {}
+        self.students_by_formation: Dict[int, List[Tuple[int, int]]] = {}
+
+        # Rooms as (id, capacite), largest first
+        self.rooms: List[Tuple[int, int]] = []
+        self.room_names: Dict[int, str] = {}
+
+        # Professors as (id, dept_id)
+        self.professors: List[Tuple[int, int]] = []
+        self.professor_names: Dict[int, str] = {}
+
+        # Existing exams as plain dicts (see ScheduleState.place for the keys)
+        self.exams: List[Dict] = []
+
+        # Module x module conflict matrix and room fit order, built on first use
+        self._conflict_graph = None
+        self._room_fit_order = None
+
+        # Snapshot file the model was loaded from (see timetable_snapshot), if any
+        self.snapshot_path: str = None
+
+    def __getstate__(self):
+        # Enrollments of a snapshot are memoryviews on the mapped file: copy them
+        state = dict(self.__dict__)
+        state["module_students"] = {
+            module_id: students if isinstance(students, list) else list(students)
+            for module_id, students in self.module_students.items()
+        }
+        return state
+
+    @classmethod
+    def load(cls, db: Session) -> "ProblemModel":
+        """Read modules, inscriptions, rooms, professors and exams in one go"""
+        model = cls.load_catalogue(db)
+        model.exams = load_exams(db)
+        return model
+
+    @classmethod
+    def load_catalogue(cls, db: Session) -> "ProblemModel":
+        """Read everything but the exams (the part kept by ModelCache)"""
+        model = cls()
+
+        for module_id, nom, formation_id, duree_examen in db.query(
+            Module.id, Module.nom, Module.formation_id, Module.duree_examen
+        ).order_by(Module.id).all():
+            model.module_ids.append(module_id)
+            model.module_names[module_id] = nom
+            model.module_formation[module_id] = formation_id
+            model.module_duration[module_id] = duree_examen or DEFAULT_DURATION
+
+        for formation_id, nom, dept_id in db.query(
+            Formation.id, Formation.nom, Formation.dept_id
+        ).all():
+            model.formation_names[formation_id] = nom
+            model.formation_dept[formation_id] = dept_id
+
+        # Inscriptions joined with the student's formation, in a single scan
+        counts: Dict[int, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        module_students: Dict[int, List[int]] = defaultdict(list)
+        for module_id, etudiant_id, formation_id in db.query(
+            inscriptions.c.module_id, inscriptions.c.etudiant_id, Etudiant.formation_id
+        ).join(
+            Etudiant, Etudiant.id == inscriptions.c.etudiant_id
+        ).all():
+            module_students[module_id].append(etudiant_id)
+            counts[module_id][formation_id] += 1
+
+        for module_id in model.module_ids:
+            model.module_students[module_id] = module_students.get(module_id, [])
+            model.students_by_formation[module_id] = sorted(
+                counts[module_id].items(), key=lambda x: x[0] or 0
+            ) if module_id in counts else []
+
+        for room_id, nom, capacite in db.query(
+            Salle.id, Salle.nom, Salle.capacite
+        ).order_by(Salle.capacite.desc(), Salle.id).all():
+            model.rooms.append((room_id, capacite or 0))
+            model.room_names[room_id] = nom
+
+        for prof_id, nom, dept_id in db.query(
+            Professeur.id, Professeur.nom, Professeur.dept_id
+        ).order_by(Professeur.id).all():
+            model.professors.append((prof_id, dept_id))
+            model.professor_names[prof_id] = nom
+        return model
+
+    def with_exams(self, exams: List[Dict]) -> "ProblemModel":
+        """
+        Model sharing this one's catalogue (and conflict graph, once built) with
+        its own list of exams. The shared parts are never modified.
+        """
+        model = ProblemModel.__new__(ProblemModel)
+        model.__dict__.update(self.__dict__)
+        model.exams = exams
+        return model
+
+    def module_dept(self, module_id: int) -> int:
+        """Department of the formation a module belongs to"""
+        return self.formation_dept.get(self.module_formation.get(module_id))
+
+    @property
+    def room_fit_order(self) -> List[Tuple[int, int, int]]:
+        """
+        Usable rooms as (exam capacity, capacite, id), smallest first. Exam capacity
+        is capped at 20 seats, so among equal exam capacities the smaller room comes
+        first and large amphitheatres are kept for last.
+        """
+        if self._room_fit_order is None:
+            self._room_fit_order = sorted(
+                (min(capacite, 20), capacite, room_id)
+                for room_id, capacite in self.rooms if min(capacite, 20) > 0
+            )
+        return self._room_fit_order
+
+    @property
+    def conflict_graph(self) -> "ConflictGraph":
+        if self._conflict_graph is None:
+            self._conflict_graph = ConflictGraph(self.module_ids, self.module_students)
+        return self._conflict_graph
+
+    def components(self) -> List[List[int]]:
+        """
+        Split the modules into independent groups: two modules are in the same group
+        when they are linked by shared students or by a formation. Groups are
+        returned largest first, each in database order.
+        """
+        graph = self.conflict_graph
+        formation_bits: Dict[int, int] = defaultdict(int)
+        for module_id in self.module_ids:
+            formation_bits[self.module_formation[module_id]] |= graph.bit(module_id)
+
+        components = []
+        unvisited = (1 << len(self.module_ids)) - 1
+        while unvisited:
+            frontier = unvisited & -unvisited
+            component = 0
+            while frontier:
+                component |= frontier
+                unvisited &= ~frontier
+                reached = 0
+                remaining = frontier
+                while remaining:
+                    low = remaining & -remaining
+                    remaining ^= low
+                    module_id = graph.module_ids[low.bit_length() - 1]
+                    reached |= graph.masks[low.bit_length() - 1]
+                    reached |= formation_bits[self.module_formation[module_id]]
+                frontier = reached & unvisited
+            components.append([
+                module_id for i, module_id in enumerate(graph.module_ids) if component >> i & 1
+            ])
+        components.sort(key=len, reverse=True)
+        return components
+
+    def subset(self, module_ids: List[int], room_ids: Set[int], prof_ids: Set[int]) -> "ProblemModel":
+        """Smaller model restricted to some modules, rooms and professors"""
+        modules = set(module_ids)
+        model = ProblemModel()
+        model.module_ids = [module_id for module_id in self.module_ids if module_id in modules]
+        for module_id in model.module_ids:
+            model.module_names[module_id] = self.module_names[module_id]
+            model.module_formation[module_id] = self.module_formation[module_id]
+            model.module_duration[module_id] = self.module_duration[module_id]
+            model.module_students[module_id] = self.module_students[module_id]
+            model.students_by_formation[module_id] = self.students_by_formation[module_id]
+        model.formation_names = self.formation_names
+        model.formation_dept = self.formation_dept
+        model.rooms = [room for room in self.rooms if room[0] in room_ids]
+        model.room_names = {room_id: self.room_names[room_id] for room_id, _ in model.rooms}
+        model.professors = [prof for prof in self.professors if prof[0] in prof_ids]
+        model.professor_names = {prof_id: self.professor_names[prof_id] for prof_id, _ in model.professors}
+        model.exams = [exam for exam in self.exams if exam["module_id"] in modules]
+        return model
+
+
+def load_exams(db: Session) -> List[Dict]:
+    """Load every exam with its rooms and supervisors (three queries in total)"""
+    rooms_by_exam: Dict[int, List[int]] = defaultdict(list)
+    for examen_id, salle_id in db.query(examens_salles.c.examen_id, examens_salles.c.salle_id).all():
+        rooms_by_exam[examen_id].append(salle_id)
+
+    profs_by_exam: Dict[int, List[int]] = defaultdict(list)
+    for examen_id, prof_id in db.query(surveillances.c.examen_id, surveillances.c.prof_id).all():
+        profs_by_exam[examen_id].append(prof_id)
+
+    exams = []
+    for row in db.query(
+        Examen.id, Examen.module_id, Examen.date, Examen.heure, Examen.duree,
+        Examen.dept_head_approved, Examen.vice_dean_approved
+    ).order_by(Examen.id).all():
+        exams.append({
+            "id": row[0],
+            "module_id": row[1],
+            "date": row[2],
+            "heure": row[3],
+            "duree": row[4],
+            "dept_head_approved": row[5] or 0,
+            "vice_dean_approved": row[6] or 0,
+            "salle_ids": rooms_by_exam.get(row[0], []),
+            "prof_ids": profs_by_exam.get(row[0], []),
+        })
+    return exams
+
+
+class ModelCache:
+    """
+    Keeps the catalogue part of the problem model (modules, inscriptions and their
+    conflict graph, rooms, professors) between generations, in process. It is
+    keyed by the versions of the catalogue tables (see versions.py): any write
+    to one of them bumps it, and the next call reloads. Exams change with every
+    generation, so they are always read fresh.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version: Tuple[int, ...] = None
+        self.model: ProblemModel = None
+
+    def get(self, db: Session) -> ProblemModel:
+        """Problem model for the current data (one query when the catalogue is cached)"""
+        versions = get_versions(db, CATALOGUE)
+        with self.lock:
+            if self.model is None or self.version != versions:
+                model = ProblemModel.load_catalogue(db)
+                # Built once here, then shared by every model handed out
+                model.conflict_graph
+                model.room_fit_order
+                self.model, self.version = model, versions
+            cached = self.model
+        return cached.with_exams(load_exams(db))
+
+
+model_cache = ModelCache()
+
+
+class ConflictGraph:
+    """
+    Module x module conflict matrix built from the inscriptions in one pass.
+    The matrix is kept sparse (shared-student counts per neighbour) and each
+    row is also stored as a bitset over module indexes, so asking whether a
+    module clashes with a whole day of exams is a single AND of two integers.
+    """
+    def __init__(self, module_ids: List[int], module_students: Dict[int, List[int]]):
+        self.module_ids = list(module_ids)
+        self.index: Dict[int, int] = {module_id: i for i, module_id in enumerate(self.module_ids)}
+        size = len(self.module_ids)
+
+        # Students with the same set of modules (typically a whole formation)
+        # contribute the same pairs, so count each distinct enrollment set once
+        modules_by_student: Dict[int, List[int]] = defaultdict(list)
+        for module_id, students in module_students.items():
+            idx = self.index.get(module_id)
+            if idx is None:
+                continue
+            for etudiant_id in students:
+                modules_by_student[etudiant_id].append(idx)
+
+        enrollment_sets: Dict[Tuple[int, ...], int] = defaultdict(int)
+        for module_indexes in modules_by_student.values():
+            if len(module_indexes) > 1:
+                enrollment_sets[tuple(sorted(module_indexes))] += 1
+
+        # Sparse rows: neighbour index -> number of shared students
+        self.shared: List[Dict[int, int]] = [{} for _ in range(size)]
+        for module_indexes, student_count in enrollment_sets.items():
+            for a in module_indexes:
+                row = self.shared[a]
+                for b in module_indexes:
+                    if a != b:
+                        row[b] = row.get(b, 0) + student_count
+
+        # Bitset rows: bit b of masks[a] is set when a and b share a student
+        self.masks: List[int] = [0] * size
+        for a, row in enumerate(self.shared):
+            mask = 0
+            for b in row:
+                mask |= 1 << b
+            self.masks[a] = mask
+
+    def bit(self, module_id: int) -> int:
+        """Bitset containing only this module"""
+        return 1 << self.index[module_id]
+
+    def degree(self, module_id: int) -> int:
+        """Number of modules sharing at least one student with this module"""
+        return len(self.shared[self.index[module_id]])
+
+    def shared_students(self, module_a: int, module_b: int) -> int:
+        """Number of students enrolled in both modules"""
+        return self.shared[self.index[module_a]].get(self.index[module_b], 0)
+
+    def clashes(self, module_id: int, day_mask: int) -> bool:
+        """Whether the module shares a student with any module in the bitset"""
+        return (self.masks[self.index[module_id]] & day_mask) != 0
+
+
+class IntervalIndex:
+    """
+    Bookings [start, end) in minutes per key (a room or professor on a day),
+    kept sorted by start. An overlap query bisects to the bookings that could
+    reach the interval: only those starting less than the longest booking of
+    the key before it, so the check is O(log n) when bookings do not overlap.
+    """
+    def __init__(self):
+        self.intervals: Dict[Tuple, List[Tuple[int, int]]] = defaultdict(list)
+        self.longest: Dict[Tuple, int] = defaultdict(int)
+
+    def add(self, key: Tuple, start: int, end: int):
+        insort(self.intervals[key], (start, end))
+        self.longest[key] = max(self.longest[key], end - start)
+
+    def remove(self, key: Tuple, start: int, end: int):
+        intervals = self.intervals[key]
+        i = bisect_left(intervals, (start, end))
+        if i < len(intervals) and intervals[i] == (start, end):
+            del intervals[i]
+
+    def overlaps(self, key: Tuple, start: int, end: int) -> bool:
+        intervals = self.intervals.get(key)
+        if not intervals:
+            return False
+        i = bisect_left(intervals, (start - self.longest[key] + 1,))
+        stop = bisect_left(intervals, (end,))
+        for j in range(i, stop):
+            if intervals[j][1] > start:
+                return True
+        return False
+
+class ScheduleState:
+    """
+    Mutable bookkeeping for a timetable built in memory.
+    Every constraint the generator checks is answered from these indexes,
+    and exams can be removed again so the search can move them around.
+    """
+    def __init__(self, model: ProblemModel):
+        self.model = model
+        # Placed exams keyed by object identity, so remove() does not scan
+        self.exams: Dict[int, Dict] = {}
+
+        # Modules examined on each day (as a set and as a ConflictGraph bitset)
+        # and number of exams per formation on each day
+        self.modules_by_date: Dict[date, Set[int]] = defaultdict(set)
+        self.day_masks: Dict[date, int] = defaultdict(int)
+        self.formations_by_date: Dict[date, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+        # Room and professor bookings as minute intervals per (id, date), and the
+        # free rooms of each (date, start, end) interval in ProblemModel.room_fit_order
+        # (created on first lookup, then kept in sync)
+        self.room_intervals = IntervalIndex()
+        self._free_rooms: Dict[Tuple[date, int, int], List[Tuple[int, int, int]]] = {}
+        self._free_room_spans: Dict[date, List[Tuple[int, int]]] = defaultdict(list)
+        self._room_keys: Dict[int, Tuple[int, int, int]] = {
+            key[2]: key for key in model.room_fit_order
+        }
+
+        # Professor supervisions as intervals per (prof, date), and counted per (prof, date)
+        self.prof_intervals = IntervalIndex()
+        self.prof_daily: Dict[Tuple[int, date], int] = defaultdict(int)
+
+        # Total supervisions per professor, with min-heaps of (load, prof_id) per
+        # department and overall. Entries are never updated in place: a new one is
+        # pushed when a load changes and outdated ones are skipped when popped.
+        self.prof_loads: Dict[int, int] = {prof_id: 0 for prof_id, _ in model.professors}
+        self._prof_dept: Dict[int, int] = dict(model.professors)
+        self._rebuild_prof_heaps()
+
+        # (prof, date) pairs on which a professor cannot supervise at all
+        self.blocked_profs: Set[Tuple[int, date]] = set()
+
+    @staticmethod
+    def span(exam: Dict) -> Tuple[int, int]:
+        """Start and end of an exam in minutes since midnight"""
+        start = minutes(exam["heure"])
+        return start, start + (exam["duree"] or DEFAULT_DURATION)
+
+    def place(self, exam: Dict):
+        """
+        Record an exam. Expected keys: module_id, date, heure, duree,
+        salle_ids, prof_ids (and id / approval flags for existing exams).
+        """
+        module_id = exam["module_id"]
+        exam_date = exam["date"]
+        start, end = self.span(exam)
+        self.exams[id(exam)] = exam
+        self.modules_by_date[exam_date].add(module_id)
+        if module_id in self.model.conflict_graph.index:
+            self.day_masks[exam_date] |= self.model.conflict_graph.bit(module_id)
+        self.formations_by_date[exam_date][self.model.module_formation.get(module_id)] += 1
+        for room_id in exam["salle_ids"]:
+            self._book_room(room_id, exam_date, start, end)
+        for prof_id in exam["prof_ids"]:
+            self.prof_intervals.add((prof_id, exam_date), start, end)
+            self.prof_daily[(prof_id, exam_date)] += 1
+            self._change_load(prof_id, 1)
+
+    def remove(self, exam: Dict):
+        """Undo place() for an exam previously recorded"""
+        module_id = exam["module_id"]
+        exam_date = exam["date"]
+        start, end = self.span(exam)
+        del self.exams[id(exam)]
+        self.modules_by_date[exam_date].discard(module_id)
+        if module_id in self.model.conflict_graph.index:
+            self.day_masks[exam_date] &= ~self.model.conflict_graph.bit(module_id)
+        formations_today = self.formations_by_date[exam_date]
+        formation_id = self.model.module_formation.get(module_id)
+        formations_today[formation_id] -= 1
+        if formations_today[formation_id] <= 0:
+            del formations_today[formation_id]
+        for room_id in exam["salle_ids"]:
+            self._release_room(room_id, exam_date, start, end)
+        for prof_id in exam["prof_ids"]:
+            self.prof_intervals.remove((prof_id, exam_date), start, end)
+            self.prof_daily[(prof_id, exam_date)] -= 1
+            self._change_load(prof_id, -1)
+
+    def _book_room(self, room_id: int, exam_date: date, start: int, end: int):
+        self.room_intervals.add((room_id, exam_date), start, end)
+        key = self._room_keys.get(room_id)
+        if key is None:
+            return
+        for span_start, span_end in self._free_room_spans.get(exam_date, ()):
+            if span_start < end and start < span_end:
+                free = self._free_rooms[(exam_date, span_start, span_end)]
+                i = bisect_left(free, key)
+                if i < len(free) and free[i] == key:
+                    del free[i]
+
+    def _release_room(self, room_id: int, exam_date: date, start: int, end: int):
+        self.room_intervals.remove((room_id, exam_date), start, end)
+        key = self._room_keys.get(room_id)
+        if key is None:
+            return
+        for span_start, span_end in self._free_room_spans.get(exam_date, ()):
+            if span_start < end and start < span_end and not self.room_intervals.overlaps(
+                (room_id, exam_date), span_start, span_end
+            ):
+                free = self._free_rooms[(exam_date, span_start, span_end)]
+                i = bisect_left(free, key)
+                if i == len(free) or free[i] != key:
+                    free.insert(i, key)
+
+    def block_room(self, room_id: int, exam_date: date):
+        """Make a room unavailable for a whole day without booking it for an exam"""
+        self._book_room(room_id, exam_date, 0, 24 * 60)
+
+    def block_professor(self, prof_id: int, exam_date: date):
+        """Keep a professor out of pick_professors for a whole day"""
+        self.blocked_profs.add((prof_id, exam_date))
+
+    def free_rooms(self, exam_date: date, exam_time: time, duration: int) -> List[Tuple[int, int, int]]:
+        """
+        Rooms free for `duration` minutes from `exam_time`, as (exam capacity, capacite, id),
+        smallest first (do not modify)
+        """
+        start = minutes(exam_time)
+        key = (exam_date, start, start + duration)
+        free = self._free_rooms.get(key)
+        if free is None:
+            overlaps = self.room_intervals.overlaps
+            free = [
+                room for room in self.model.room_fit_order
+                if not overlaps((room[2], exam_date), start, start + duration)
+            ]
+            self._free_rooms[key] = free
+            self._free_room_spans[exam_date].append((start, start + duration))
+        return free
+
+    def prof_busy(self, prof_id: int, exam_date: date, exam_time: time, duration: int) -> bool:
+        """Whether a professor supervises an exam overlapping this interval"""
+        start = minutes(exam_time)
+        return self.prof_intervals.overlaps((prof_id, exam_date), start, start + duration)
+
+    def pick_professors(self, dept_id: int, exam_date: date, exam_time: time, count: int,
+                        duration: int = DEFAULT_DURATION) -> List[int]:
+        """
+        Up to `count` professors free for `duration` minutes from `exam_time` and under
+        3 supervisions that day, least loaded first, taking the department's professors
+        before anyone else.
+        """
+        start = minutes(exam_time)
+        end = start + duration
+        overlaps = self.prof_intervals.overlaps
+        chosen: List[int] = []
+        for heap in (self._prof_heaps.get(dept_id, []), self._prof_heap):
+            popped = []
+            while heap and len(chosen) < count:
+                entry = heappop(heap)
+                load, prof_id = entry
+                if load != self.prof_loads[prof_id]:
+                    continue  # Outdated entry
+                popped.append(entry)
+                if prof_id in chosen:
+                    continue
+                if overlaps((prof_id, exam_date), start, end):
+                    continue
+                if self.prof_daily[(prof_id, exam_date)] >= 3:
+                    continue
+                if (prof_id, exam_date) in self.blocked_profs:
+                    continue
+                chosen.append(prof_id)
+            for entry in popped:
+                heappush(heap, entry)
+            if len(chosen) >= count:
+                break
+        return chosen
+
+    def _change_load(self, prof_id: int, delta: int):
+        if prof_id not in self.prof_loads:
+            return  # Professor no longer in the catalogue
+        load = self.prof_loads[prof_id] + delta
+        self.prof_loads[prof_id] = load
+        heappush(self._prof_heap, (load, prof_id))
+        heappush(self._prof_heaps[self._prof_dept[prof_id]], (load, prof_id))
+        # Drop outdated entries once they outnumber the live ones
+        if len(self._prof_heap) > 4 * len(self.prof_loads) + 16:
+            self._rebuild_prof_heaps()
+
+    def _rebuild_prof_heaps(self):
+        self._prof_heap: List[Tuple[int, int]] = []
+        self._prof_heaps: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for prof_id, load in self.prof_loads.items():
+            self._prof_heap.append((load, prof_id))
+            self._prof_heaps[self._prof_dept[prof_id]].append((load, prof_id))
+        heapify(self._prof_heap)
+        for heap in self._prof_heaps.values():
+            heapify(heap)
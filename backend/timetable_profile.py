@@ -0,0 +1,137 @@
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List
+import functools
+import logging
+import time as clock
+from sqlalchemy import event
+
+logger = logging.getLogger("timetable.profile")
+
+# Distinct SQL statements kept per phase (the count covers all of them)
+MAX_STATEMENTS = 20
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off: phases cost one no-op context manager"""
+    def phase(self, name: str):
+        return nullcontext()
+
+
+class PhaseProfiler:
+    """
+    Records where a generation run spends its time.
+    - phases: wall time, SQL statement count and the statements themselves,
+      for each block wrapped in `with profiler.phase(name)`
+    - helpers: call count and cumulative (inclusive) time of instrumented methods
+    SQL is counted through a cursor listener on the session's engine, attributed
+    to the innermost phase running at the time. Only statements sent on the
+    connection the session holds are counted, not those of concurrent requests
+    or jobs sharing the engine.
+    """
+
+    def __init__(self, db=None):
+        self.started = clock.perf_counter()
+        self.phases: Dict[str, Dict] = {}
+        self.helpers: Dict[str, Dict] = {}
+        self.stack: List[str] = []
+        self.instrumented: List = []
+        self.db = db
+        self.engine = db.get_bind() if db is not None else None
+        # Connection of the session's current transaction (follows it across commits)
+        self.connection = None
+        if self.engine is not None:
+            if db.in_transaction():
+                self.connection = db.connection()
+            event.listen(db, "after_begin", self._on_begin)
+            event.listen(self.engine, "before_cursor_execute", self._on_sql)
+
+    @contextmanager
+    def phase(self, name: str):
+        entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0, "queries": 0, "statements": {}})
+        entry["calls"] += 1
+        self.stack.append(name)
+        started = clock.perf_counter()
+        try:
+            yield
+        finally:
+            entry["seconds"] += clock.perf_counter() - started
+            self.stack.pop()
+
+    def instrument(self, obj, method_names: List[str]):
+        """Replace the given methods of `obj` (on the instance only) by timed wrappers"""
+        for name in method_names:
+            setattr(obj, name, self._timed(name, getattr(obj, name)))
+            self.instrumented.append((obj, name))
+
+    def _timed(self, name: str, method: Callable) -> Callable:
+        entry = self.helpers.setdefault(name, {"calls": 0, "seconds": 0.0})
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = clock.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                entry["calls"] += 1
+                entry["seconds"] += clock.perf_counter() - started
+        return wrapper
+
+    def _on_begin(self, session, transaction, connection):
+        self.connection = connection
+
+    def _on_sql(self, conn, cursor, statement, parameters, context, executemany):
+        if conn is not self.connection:
+            return
+        name = self.stack[-1] if self.stack else "other"
+        entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0, "queries": 0, "statements": {}})
+        entry["queries"] += 1
+        statement = " ".join(statement.split())
+        statements = entry["statements"]
+        if statement in statements or len(statements) < MAX_STATEMENTS:
+            statements[statement] = statements.get(statement, 0) + 1
+
+    def close(self):
+        """Stop listening to SQL and restore instrumented methods (call once the run is over)"""
+        for obj, name in self.instrumented:
+            vars(obj).pop(name, None)
+        self.instrumented = []
+        if self.engine is not None:
+            event.remove(self.engine, "before_cursor_execute", self._on_sql)
+            event.remove(self.db, "after_begin", self._on_begin)
+            self.engine = None
+            self.connection = None
+
+    def report(self) -> Dict:
+        """Profile as plain data, slowest entries first"""
+        return {
+            "total_seconds": round(clock.perf_counter() - self.started, 4),
+            "phases": [
+                {
+                    "name": name,
+                    "seconds": round(entry["seconds"], 4),
+                    "calls": entry["calls"],
+                    "queries": entry["queries"],
+                    "statements": [
+                        {"sql": sql, "count": count} for sql, count in entry["statements"].items()
+                    ],
+                }
+                for name, entry in sorted(self.phases.items(), key=lambda item: -item[1]["seconds"])
+            ],
+            "helpers": [
+                {"name": name, "calls": entry["calls"], "seconds": round(entry["seconds"], 4)}
+                for name, entry in sorted(self.helpers.items(), key=lambda item: -item[1]["seconds"])
+                if entry["calls"]
+            ],
+        }
+
+    def log(self, report: Dict = None):
+        """Write a readable summary of the profile to the timetable.profile logger"""
+        report = report or self.report()
+        logger.info("Timetable generation took %.3fs", report["total_seconds"])
+        for phase in report["phases"]:
+            logger.info("  phase %-20s %8.4fs %6d queries", phase["name"], phase["seconds"], phase["queries"])
+        for helper in report["helpers"]:
+            logger.info("  helper %-40s %8.4fs %8d calls", helper["name"], helper["seconds"], helper["calls"])
+
+
+NULL_PROFILER = NullProfiler()
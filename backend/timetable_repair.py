@@ -0,0 +1,126 @@
+from datetime import date, time
+from typing import List, Dict, Tuple
+from timetable_model import ScheduleState
+
+class TimetableRepair:
+    """
+    Patches an existing timetable after a single change instead of regenerating it.
+    Supported events:
+    - exam_deleted: the module of a deleted exam gets a new exam
+    - room_unavailable: exams using the room get other rooms at the same slot
+    - professor_unavailable: the professor's supervisions go to colleagues free at the same slot
+    An exam is only moved to another day or time when its slot cannot be kept;
+    the day closest to the original one is tried first. Every other exam stays as
+    it is, approvals included.
+    """
+    EVENTS = ("exam_deleted", "room_unavailable", "professor_unavailable")
+
+    def __init__(self, generator, state: ScheduleState, days: List[date], available_slots: List[time]):
+        self.generator = generator
+        self.model = generator.model
+        self.state = state
+        self.days = days
+        self.available_slots = available_slots
+        # (old exam or None, new exam or None) for every exam touched
+        self.changes: List[Tuple[Dict, Dict]] = []
+        # Modules that could not be given a valid exam
+        self.failed: List[int] = []
+        # (module_id, date, heure) of a deleted exam, not offered to its module again
+        self.cancelled: Tuple[int, date, time] = None
+
+    def _affected(self, dates: List[date], condition) -> List[Dict]:
+        return sorted(
+            (exam for exam in self.state.exams.values() if exam["date"] in dates and condition(exam)),
+            key=lambda e: (e["date"], e["heure"], e["module_id"])
+        )
+
+    # ==================== EVENTS ====================
+    def exam_deleted(self, module_id: int, examen_id: int = None):
+        """Give a module a new exam; its exam `examen_id`, if still present, is dropped first"""
+        for exam in list(self.state.exams.values()):
+            if examen_id is not None and exam.get("id") == examen_id:
+                self.state.remove(exam)
+                self.changes.append((exam, None))
+                self.cancelled = (exam["module_id"], exam["date"], exam["heure"])
+
+        exam = self._relocate(module_id, None)
+        if exam is None:
+            self.failed.append(module_id)
+        else:
+            self.changes.append((None, exam))
+
+    def room_unavailable(self, room_id: int, dates: List[date]):
+        """Take a room out of service on `dates`"""
+        affected = self._affected(dates, lambda exam: room_id in exam["salle_ids"])
+        for exam in affected:
+            self.state.remove(exam)
+        for exam_date in dates:
+            self.state.block_room(room_id, exam_date)
+
+        for exam in affected:
+            rooms = self.generator._find_rooms_for_students_by_formation(
+                self.state, self.model.students_by_formation[exam["module_id"]], exam["date"], exam["heure"],
+                exam["duree"]
+            )
+            if rooms:
+                self._replace(exam, dict(exam, salle_ids=rooms))
+            else:
+                self._move(exam)
+
+    def professor_unavailable(self, prof_id: int, dates: List[date]):
+        """Remove a professor from the supervisions of `dates`"""
+        for exam_date in dates:
+            self.state.block_professor(prof_id, exam_date)
+
+        for exam in self._affected(dates, lambda exam: prof_id in exam["prof_ids"]):
+            # Keep the other supervisors booked so they cannot be picked twice
+            self.state.remove(exam)
+            kept = dict(exam, prof_ids=[p for p in exam["prof_ids"] if p != prof_id])
+            self.state.place(kept)
+            missing = len(exam["prof_ids"]) - len(kept["prof_ids"])
+            replacements = self.state.pick_professors(
+                self.model.module_dept(exam["module_id"]), exam["date"], exam["heure"], missing, exam["duree"]
+            )
+            self.state.remove(kept)
+            if len(replacements) == missing:
+                self._replace(exam, dict(kept, prof_ids=kept["prof_ids"] + replacements))
+            else:
+                self._move(exam)
+
+    # ==================== HELPERS ====================
+    def _replace(self, old: Dict, new: Dict):
+        """Place and record an exam kept at its slot with other rooms or supervisors"""
+        self.state.place(new)
+        self.changes.append((old, new))
+
+    def _move(self, exam: Dict):
+        """Re-place an exam whose slot cannot be kept (state no longer holds it)"""
+        moved = self._relocate(exam["module_id"], exam["date"])
+        if moved is None:
+            # Nothing better: keep the exam as it was and report it
+            self.state.place(exam)
+            self.failed.append(exam["module_id"])
+            return
+        moved["id"] = exam.get("id")
+        self.changes.append((exam, moved))
+
+    def _relocate(self, module_id: int, near: date) -> Dict:
+        """Place a module on the free slot closest to `near` (earliest first when None)"""
+        days = list(self.days)
+        if near is not None:
+            days.sort(key=lambda d: (abs((d - near).days), d))
+        generator = self.generator
+        formation_id = self.model.module_formation[module_id]
+        for exam_date in days:
+            if generator._check_formation_conflict(self.state, formation_id, exam_date, module_id):
+                continue
+            if generator._check_student_conflicts(self.state, module_id, exam_date, None):
+                continue
+            for slot in self.available_slots:
+                if self.cancelled == (module_id, exam_date, slot):
+                    continue
+                exam = generator._try_slot(self.state, module_id, exam_date, slot)
+                if exam is not None:
+                    self.state.place(exam)
+                    return exam
+        return None
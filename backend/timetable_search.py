@@ -0,0 +1,225 @@
+from datetime import date, time
+from typing import List, Dict, Tuple
+import math
+import random
+import time as clock
+from timetable_model import ScheduleState
+
+class LocalSearch:
+    """
+    Anytime improvement stage run after the first scheduling pass, entirely in memory.
+    Simulated annealing over four moves:
+    - move an exam to another day/slot (preferring days already in use)
+    - swap the days of two exams
+    - hand a supervision over to a less loaded professor
+    - place a module the first pass could not schedule
+    The aim is fewer exam days and an even invigilation load. The best timetable
+    seen is returned once the wall-clock budget is spent.
+    """
+    # Start and end temperatures of the annealing schedule
+    START_TEMPERATURE = 5.0
+    END_TEMPERATURE = 0.05
+    # Longest wall-clock budget a request may give the search, in seconds
+    MAX_SECONDS = 300
+
+    def __init__(self, generator, state: ScheduleState, new_exams: List[Dict],
+                 unscheduled: List[int], days: List[date], available_slots: List[time],
+                 seed: int = 0):
+        self.generator = generator
+        self.model = generator.model
+        self.state = state
+        self.days = days
+        self.available_slots = available_slots
+        self.rng = random.Random(seed)
+        self.prof_dept: Dict[int, int] = dict(self.model.professors)
+
+        # Generated exams by module, and the modules still waiting for an exam
+        self.exam_of: Dict[int, Dict] = {exam["module_id"]: exam for exam in new_exams}
+        self.unscheduled: List[int] = list(unscheduled)
+
+        # Exams per day and supervisions per professor (running sums for the variance)
+        self.day_counts: Dict[date, int] = {}
+        self.loads: Dict[int, int] = {prof_id: 0 for prof_id, _ in self.model.professors}
+        self.load_sum = 0
+        self.load_squares = 0
+        for exam in new_exams:
+            self._count(exam, 1)
+
+    def run(self, budget_seconds: float) -> Tuple[List[Dict], List[int]]:
+        """Improve until the budget is spent, return the best exams and unscheduled modules"""
+        started = clock.perf_counter()
+        best_cost = self.cost()
+        best = ([dict(exam) for exam in self.exam_of.values()], list(self.unscheduled))
+        moves = (self._move_exam, self._swap_exams, self._reassign_supervisor, self._insert_unscheduled)
+
+        while True:
+            elapsed = clock.perf_counter() - started
+            if elapsed >= budget_seconds or not self.exam_of:
+                break
+            temperature = self.START_TEMPERATURE * (
+                self.END_TEMPERATURE / self.START_TEMPERATURE
+            ) ** (elapsed / budget_seconds)
+
+            self.rng.choice(moves)(temperature)
+
+            cost = self.cost()
+            if cost < best_cost:
+                best_cost = cost
+                best = ([dict(exam) for exam in self.exam_of.values()], list(self.unscheduled))
+
+        return best
+
+    def cost(self) -> Tuple[int, int, float]:
+        """Same ranking as TimetableGenerator._score: unscheduled, days used, load variance"""
+        return len(self.unscheduled), len(self.day_counts), round(self._variance(), 6)
+
+    def _energy(self) -> float:
+        """Scalar version of cost() used for the annealing acceptance test"""
+        return 100 * len(self.unscheduled) + 10 * len(self.day_counts) + self._variance()
+
+    def _variance(self) -> float:
+        count = len(self.loads)
+        if not count:
+            return 0
+        mean = self.load_sum / count
+        return self.load_squares / count - mean * mean
+
+    def _accept(self, energy_before: float, temperature: float) -> bool:
+        delta = self._energy() - energy_before
+        return delta <= 0 or self.rng.random() < math.exp(-delta / temperature)
+
+    # ==================== BOOKKEEPING ====================
+    def _count(self, exam: Dict, sign: int):
+        exam_date = exam["date"]
+        self.day_counts[exam_date] = self.day_counts.get(exam_date, 0) + sign
+        if self.day_counts[exam_date] <= 0:
+            del self.day_counts[exam_date]
+        for prof_id in exam["prof_ids"]:
+            load = self.loads.get(prof_id, 0)
+            self.load_sum += sign
+            self.load_squares += (load + sign) ** 2 - load ** 2
+            self.loads[prof_id] = load + sign
+
+    def _place(self, exam: Dict):
+        self.state.place(exam)
+        self.exam_of[exam["module_id"]] = exam
+        self._count(exam, 1)
+
+    def _unplace(self, exam: Dict):
+        self.state.remove(exam)
+        del self.exam_of[exam["module_id"]]
+        self._count(exam, -1)
+
+    def _relocate(self, module_id: int, candidate_dates: List[date]) -> Dict:
+        """Place a module on the first candidate date with a free slot, or return None"""
+        generator = self.generator
+        formation_id = self.model.module_formation[module_id]
+        for exam_date in candidate_dates:
+            if generator._check_formation_conflict(self.state, formation_id, exam_date, module_id):
+                continue
+            if generator._check_student_conflicts(self.state, module_id, exam_date, None):
+                continue
+            slots = list(self.available_slots)
+            self.rng.shuffle(slots)
+            for slot in slots:
+                exam = generator._try_slot(self.state, module_id, exam_date, slot)
+                if exam is not None:
+                    self._place(exam)
+                    return exam
+        return None
+
+    def _candidate_dates(self, exclude: date = None, count: int = 5) -> List[date]:
+        """A few target days, mostly among the days already in use"""
+        if self.rng.random() < 0.8:
+            pool = [d for d in self.day_counts if d != exclude]
+        else:
+            pool = [d for d in self.days if d != exclude]
+        if len(pool) > count:
+            pool = self.rng.sample(pool, count)
+        else:
+            self.rng.shuffle(pool)
+        return pool
+
+    # ==================== MOVES ====================
+    def _move_exam(self, temperature: float):
+        """Move one exam to another day and slot, often taken from the emptiest day"""
+        if self.rng.random() < 0.5:
+            emptiest = min(self.day_counts, key=lambda d: (self.day_counts[d], d))
+            modules = [m for m in self.state.modules_by_date[emptiest] if m in self.exam_of]
+        else:
+            modules = list(self.exam_of)
+        exam = self.exam_of[self.rng.choice(modules)]
+
+        energy_before = self._energy()
+        self._unplace(exam)
+        moved = self._relocate(exam["module_id"], self._candidate_dates(exclude=exam["date"]))
+        if moved is None:
+            self._place(exam)
+            return
+        if not self._accept(energy_before, temperature):
+            self._unplace(moved)
+            self._place(exam)
+
+    def _swap_exams(self, temperature: float):
+        """Exchange the days of two exams"""
+        if len(self.exam_of) < 2:
+            return
+        first, second = (self.exam_of[m] for m in self.rng.sample(list(self.exam_of), 2))
+        if first["date"] == second["date"]:
+            return
+
+        energy_before = self._energy()
+        self._unplace(first)
+        self._unplace(second)
+        moved_first = self._relocate(first["module_id"], [second["date"]])
+        moved_second = self._relocate(second["module_id"], [first["date"]]) if moved_first else None
+        if moved_second is None or not self._accept(energy_before, temperature):
+            for exam in (moved_first, moved_second):
+                if exam is not None:
+                    self._unplace(exam)
+            self._place(first)
+            self._place(second)
+
+    def _reassign_supervisor(self, temperature: float):
+        """
+        Give one supervision of an exam to the least loaded free professor.
+        Department professors are only replaced by colleagues of the same department.
+        """
+        exam = self.exam_of[self.rng.choice(list(self.exam_of))]
+        if not exam["prof_ids"]:
+            return
+        prof_id = self.rng.choice(exam["prof_ids"])
+        module_dept = self.model.module_dept(exam["module_id"])
+        prof_dept = self.prof_dept.get(prof_id)
+
+        best_id = None
+        for candidate_id, candidate_dept in self.model.professors:
+            if candidate_id in exam["prof_ids"]:
+                continue
+            if prof_dept == module_dept and candidate_dept != module_dept:
+                continue
+            if self.loads[candidate_id] + 1 >= self.loads[prof_id]:
+                continue  # Would not even out the load
+            if self.state.prof_busy(candidate_id, exam["date"], exam["heure"], exam["duree"]):
+                continue
+            if self.state.prof_daily[(candidate_id, exam["date"])] >= 3:
+                continue
+            if best_id is None or self.loads[candidate_id] < self.loads[best_id]:
+                best_id = candidate_id
+        if best_id is None:
+            return
+
+        replaced = dict(exam)
+        replaced["prof_ids"] = [best_id if p == prof_id else p for p in exam["prof_ids"]]
+        self._unplace(exam)
+        self._place(replaced)
+
+    def _insert_unscheduled(self, temperature: float):
+        """Try to find a place for a module the first pass left out"""
+        if not self.unscheduled:
+            return
+        module_id = self.rng.choice(self.unscheduled)
+        used = sorted(self.day_counts)
+        unused = [d for d in self.days if d not in self.day_counts]
+        if self._relocate(module_id, used + unused) is not None:
+            self.unscheduled.remove(module_id)
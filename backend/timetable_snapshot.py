@@ -0,0 +1,212 @@
+"""
+Self-contained snapshot of the timetable generator's input (a ProblemModel).
+
+A snapshot file holds modules, formations, rooms, professors, existing exams
+and the inscriptions, so generations can be reproduced without a database:
+    python timetable_snapshot.py export problem.snap
+    python timetable_snapshot.py info problem.snap
+    python timetable_snapshot.py run problem.snap 2026-01-10 2026-02-10 --strategy dsatur
+
+Layout (little-endian):
+    8 bytes   magic b"EXAMSNAP"
+    uint32    format version
+    uint32    header length in bytes
+    header    UTF-8 JSON with everything except the inscriptions (version 2
+              adds each module's exam duration; version 1 files load with 120 minutes)
+    padding   to a multiple of 8 bytes
+    arrays    int32 arrays in CSR form: module_offsets (one entry per module plus
+              one) and student_ids; the students of the i-th module are
+              student_ids[module_offsets[i]:module_offsets[i + 1]]
+The header gives each array's byte offset (from the start of the file) and length.
+Loading maps the file into memory, so the enrollment lists are not copied.
+"""
+from array import array
+from datetime import date, time, datetime
+from typing import Dict, List
+import argparse
+import json
+import mmap
+import struct
+import sys
+from timetable_model import DEFAULT_DURATION, ProblemModel
+
+MAGIC = b"EXAMSNAP"
+VERSION = 2
+PREAMBLE = struct.Struct("<8sII")
+
+
+def _int32_array(values) -> array:
+    data = array("i", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data
+
+
+def save_snapshot(model: ProblemModel, path: str):
+    """Write a problem model to `path`"""
+    module_offsets = [0]
+    student_ids: List[int] = []
+    for module_id in model.module_ids:
+        student_ids.extend(model.module_students.get(module_id, []))
+        module_offsets.append(len(student_ids))
+
+    header = {
+        "created_at": datetime.utcnow().isoformat(),
+        "modules": [
+            [module_id, model.module_names.get(module_id), model.module_formation.get(module_id),
+             model.module_duration.get(module_id, DEFAULT_DURATION)]
+            for module_id in model.module_ids
+        ],
+        "students_by_formation": [
+            model.students_by_formation.get(module_id, []) for module_id in model.module_ids
+        ],
+        "formations": [
+            [formation_id, name, model.formation_dept.get(formation_id)]
+            for formation_id, name in model.formation_names.items()
+        ],
+        "rooms": [[room_id, model.room_names.get(room_id), capacite] for room_id, capacite in model.rooms],
+        "professors": [
+            [prof_id, model.professor_names.get(prof_id), dept_id] for prof_id, dept_id in model.professors
+        ],
+        "exams": [
+            dict(exam, date=exam["date"].isoformat(), heure=exam["heure"].isoformat())
+            for exam in model.exams
+        ],
+        "arrays": {},
+    }
+    arrays = [("module_offsets", _int32_array(module_offsets)), ("student_ids", _int32_array(student_ids))]
+
+    # Array offsets depend on the header length, which depends on the offsets:
+    # reserve room by encoding once with placeholders of the final width
+    for name, data in arrays:
+        header["arrays"][name] = [2 ** 62, len(data)]
+    start = _aligned(PREAMBLE.size + len(json.dumps(header).encode("utf-8")))
+    for name, data in arrays:
+        header["arrays"][name] = [start, len(data)]
+        start = _aligned(start + len(data) * 4)
+    encoded = json.dumps(header).encode("utf-8")
+
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        for name, data in arrays:
+            f.write(b"\0" * (header["arrays"][name][0] - f.tell()))
+            data.tofile(f)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def read_header(path: str) -> Dict:
+    """Header of a snapshot file, checking its magic and version"""
+    with open(path, "rb") as f:
+        magic, version, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a timetable snapshot")
+        if version > VERSION:
+            raise ValueError(f"Snapshot version {version} is newer than supported version {VERSION}")
+        header = json.loads(f.read(length).decode("utf-8"))
+    header["version"] = version
+    return header
+
+
+def load_snapshot(path: str) -> ProblemModel:
+    """
+    Build a ProblemModel from a snapshot file. Enrollment lists are read-only
+    views on the memory-mapped file (copied into lists only when pickled).
+    """
+    header = read_header(path)
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def int32_view(name):
+        offset, length = header["arrays"][name]
+        view = memoryview(mapped)[offset:offset + length * 4]
+        if sys.byteorder == "big":
+            data = array("i", view)
+            data.byteswap()
+            return memoryview(data)
+        return view.cast("i")
+
+    module_offsets = int32_view("module_offsets")
+    student_ids = int32_view("student_ids")
+
+    model = ProblemModel()
+    model.snapshot_path = path
+    for i, (module_id, name, formation_id, *rest) in enumerate(header["modules"]):
+        # Version 1 files predate exam durations
+        model.module_duration[module_id] = rest[0] if rest else DEFAULT_DURATION
+        model.module_ids.append(module_id)
+        model.module_names[module_id] = name
+        model.module_formation[module_id] = formation_id
+        model.module_students[module_id] = student_ids[module_offsets[i]:module_offsets[i + 1]]
+        model.students_by_formation[module_id] = [tuple(pair) for pair in header["students_by_formation"][i]]
+    for formation_id, name, dept_id in header["formations"]:
+        model.formation_names[formation_id] = name
+        model.formation_dept[formation_id] = dept_id
+    for room_id, name, capacite in header["rooms"]:
+        model.rooms.append((room_id, capacite))
+        model.room_names[room_id] = name
+    for prof_id, name, dept_id in header["professors"]:
+        model.professors.append((prof_id, dept_id))
+        model.professor_names[prof_id] = name
+    model.exams = [
+        dict(exam, date=date.fromisoformat(exam["date"]), heure=time.fromisoformat(exam["heure"]))
+        for exam in header["exams"]
+    ]
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, inspect or run timetable problem snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write the database content to a snapshot")
+    export.add_argument("path")
+
+    info = commands.add_parser("info", help="Show what a snapshot contains")
+    info.add_argument("path")
+
+    run = commands.add_parser("run", help="Generate a timetable from a snapshot (nothing is saved)")
+    run.add_argument("path")
+    run.add_argument("start_date", type=date.fromisoformat)
+    run.add_argument("end_date", type=date.fromisoformat)
+    run.add_argument("--strategy", default="greedy")
+    run.add_argument("--restarts", type=int, default=1)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--improve-seconds", type=float, default=0)
+    run.add_argument("--decompose", action="store_true")
+    run.add_argument("--profile", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from database import SessionLocal
+        db = SessionLocal()
+        try:
+            save_snapshot(ProblemModel.load(db), args.path)
+        finally:
+            db.close()
+        print(f"Snapshot written to {args.path}")
+
+    elif args.command == "info":
+        header = read_header(args.path)
+        print(f"version {header['version']}, created {header['created_at']}")
+        for key in ("modules", "formations", "rooms", "professors", "exams"):
+            print(f"{key:>12}: {len(header[key])}")
+        print(f"{'inscriptions':>12}: {header['arrays']['student_ids'][1]}")
+
+    else:
+        from timetable_generator import TimetableGenerator
+        generator = TimetableGenerator(None, load_snapshot(args.path))
+        result = generator.generate_timetable(
+            args.start_date, args.end_date, strategy=args.strategy, restarts=args.restarts,
+            seed=args.seed, improve_seconds=args.improve_seconds, dry_run=True,
+            decompose=args.decompose, profile=args.profile
+        )
+        result.pop("exams")
+        print(json.dumps(result, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+from datetime import date
+from itertools import islice
+import csv
+import io
+import json
+import threading
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models import Batiment, Examen, Formation, Module, Professeur, Salle, inscriptions, examens_salles, surveillances
+from versions import BATIMENTS, EXAMENS, INSCRIPTIONS, MODULES, PROFESSEURS, SALLES, get_versions
+
+
+def load_timetable(db: Session, module_ids: Tuple[int, ...]) -> List[Dict]:
+    """
+    Approved exams of a set of modules, ordered by date and time, with module,
+    rooms (and building) and supervisors loaded in bulk (constant query count).
+    """
+    if not module_ids:
+        return []
+    exams = db.query(Examen).filter(
+        and_(
+            Examen.module_id.in_(module_ids),
+            Examen.dept_head_approved == 1,
+            Examen.vice_dean_approved == 1
+        )
+    ).options(
+        joinedload(Examen.module),
+        selectinload(Examen.salles).joinedload(Salle.batiment),
+        selectinload(Examen.professeurs)
+    ).order_by(Examen.date, Examen.heure).all()
+
+    return [
+        {
+            "examen_id": exam.id,
+            "module": exam.module.nom,
+            "date": str(exam.date),
+            "heure": str(exam.heure),
+            "duree": exam.duree,
+            "salles": [{"id": s.id, "nom": s.nom, "batiment": s.batiment.nom} for s in exam.salles],
+            "professeurs": [{"id": p.id, "nom": p.nom} for p in exam.professeurs]
+        }
+        for exam in exams
+    ]
+
+
+class StudentTimetableCache:
+    """
+    Student timetables computed once per distinct enrollment set and shared by
+    every student having it (in practice, most of a formation).
+    - enrollment sets per student follow the enrollments version
+    - timetables per enrollment set follow the versions of the tables they show
+      (exams are bumped whenever one is created, changed, approved or deleted)
+    A request for a cached timetable costs the version check only.
+    """
+    # Enrollments first, then the tables a timetable is built from
+    TABLES = (INSCRIPTIONS, MODULES, SALLES, BATIMENTS, PROFESSEURS, EXAMENS)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions: Tuple[int, ...] = None
+        self.enrollments: Dict[int, Tuple[int, ...]] = {}
+        self.timetables: Dict[Tuple[int, ...], List[Dict]] = {}
+
+    def get(self, db: Session, etudiant_id: int) -> List[Dict]:
+        """Timetable of a student (shared list, not to be modified)"""
+        versions = get_versions(db, self.TABLES)
+        with self.lock:
+            if versions != self.versions:
+                if self.versions is None or versions[0] != self.versions[0]:
+                    self.enrollments = {}
+                self.timetables = {}
+                self.versions = versions
+            module_ids = self.enrollments.get(etudiant_id)
+
+        if module_ids is None:
+            module_ids = tuple(sorted(
+                module_id for (module_id,) in db.query(inscriptions.c.module_id).filter(
+                    inscriptions.c.etudiant_id == etudiant_id
+                ).all()
+            ))
+        with self.lock:
+            timetable = self.timetables.get(module_ids)
+            if self.versions == versions:
+                self.enrollments[etudiant_id] = module_ids
+        if timetable is not None:
+            return timetable
+
+        # Built outside the lock: two requests may build the same entry, which is harmless
+        timetable = load_timetable(db, module_ids)
+        with self.lock:
+            if self.versions == versions:
+                self.timetables[module_ids] = timetable
+        return timetable
+
+
+student_timetables = StudentTimetableCache()
+
+
+# ==================== EXPORT ====================
+# Exams read per round trip; memory stays bounded by one batch
+EXPORT_BATCH = 500
+EXPORT_COLUMNS = ["examen_id", "date", "heure", "duree", "module", "formation", "salles", "batiments", "professeurs"]
+
+
+def iter_export(db: Session, start_date: date = None, end_date: date = None,
+                batch_size: int = EXPORT_BATCH) -> Iterator[List[Dict]]:
+    """
+    Approved exams with module, formation, rooms (and building) and supervisors,
+    in date and time order, as batches of `batch_size`. Exams are read through a
+    server-side cursor; rooms and supervisors are loaded per batch with one IN
+    query each, so the whole timetable is never in memory.
+    """
+    query = db.query(
+        Examen.id, Examen.date, Examen.heure, Examen.duree, Module.nom, Formation.nom
+    ).join(
+        Module, Examen.module_id == Module.id
+    ).outerjoin(
+        Formation, Module.formation_id == Formation.id
+    ).filter(
+        and_(Examen.dept_head_approved == 1, Examen.vice_dean_approved == 1)
+    )
+    if start_date:
+        query = query.filter(Examen.date >= start_date)
+    if end_date:
+        query = query.filter(Examen.date <= end_date)
+    rows = iter(query.order_by(Examen.date, Examen.heure, Examen.id).yield_per(batch_size))
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        exam_ids = [row[0] for row in batch]
+        salles: Dict[int, List[Dict]] = {exam_id: [] for exam_id in exam_ids}
+        for exam_id, salle_id, nom, batiment in db.query(
+            examens_salles.c.examen_id, Salle.id, Salle.nom, Batiment.nom
+        ).join(
+            Salle, examens_salles.c.salle_id == Salle.id
+        ).outerjoin(
+            Batiment, Salle.batiment_id == Batiment.id
+        ).filter(examens_salles.c.examen_id.in_(exam_ids)).order_by(Salle.id).all():
+            salles[exam_id].append({"id": salle_id, "nom": nom, "batiment": batiment})
+        professeurs: Dict[int, List[Dict]] = {exam_id: [] for exam_id in exam_ids}
+        for exam_id, prof_id, nom in db.query(
+            surveillances.c.examen_id, Professeur.id, Professeur.nom
+        ).join(
+            Professeur, surveillances.c.prof_id == Professeur.id
+        ).filter(surveillances.c.examen_id.in_(exam_ids)).order_by(Professeur.id).all():
+            professeurs[exam_id].append({"id": prof_id, "nom": nom})
+
+        yield [
+            {
+                "examen_id": exam_id,
+                "date": str(exam_date),
+                "heure": str(heure),
+                "duree": duree,
+                "module": module,
+                "formation": formation,
+                "salles": salles[exam_id],
+                "professeurs": professeurs[exam_id]
+            }
+            for exam_id, exam_date, heure, duree, module, formation in batch
+        ]
+
+
+def export_ndjson(batches: Iterable[List[Dict]]) -> Iterator[str]:
+    """One JSON object per line, one chunk per batch"""
+    for batch in batches:
+        yield "".join(json.dumps(exam, ensure_ascii=False) + "\n" for exam in batch)
+
+
+def export_csv(batches: Iterable[List[Dict]]) -> Iterator[str]:
+    """Header line, then one chunk per batch; rooms, buildings and supervisors are joined with '; '"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for exam in batch:
+            writer.writerow([
+                exam["examen_id"], exam["date"], exam["heure"], exam["duree"], exam["module"], exam["formation"],
+                "; ".join(s["nom"] for s in exam["salles"]),
+                "; ".join(s["batiment"] or "" for s in exam["salles"]),
+                "; ".join(p["nom"] for p in exam["professeurs"]),
+            ])
+        yield buffer.getvalue()
+
+
+# Format name -> (media type, writer)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", export_ndjson),
+    "csv": ("text/csv", export_csv),
+}
@@ -0,0 +1,42 @@
+"""
+Data-version stamps: one counter per table, bumped in the same transaction as
+every write to that table. Anything cached from the database (in process or by
+HTTP clients through ETags) remembers the versions it was built from and is
+stale as soon as one of them moves.
+"""
+from typing import Sequence, Tuple
+from sqlalchemy.orm import Session
+from models import DataVersion
+
+DEPARTEMENTS = "departements"
+FORMATIONS = "formations"
+MODULES = "modules"
+ETUDIANTS = "etudiants"
+INSCRIPTIONS = "inscriptions"
+PROFESSEURS = "professeurs"
+BATIMENTS = "batiments"
+SALLES = "salles"
+# Exams with their rooms, supervisors and approvals
+EXAMENS = "examens"
+
+ALL_TABLES = (DEPARTEMENTS, FORMATIONS, MODULES, ETUDIANTS, INSCRIPTIONS, PROFESSEURS, BATIMENTS, SALLES, EXAMENS)
+
+# Tables the timetable generator reads besides the exams
+CATALOGUE = (FORMATIONS, MODULES, ETUDIANTS, INSCRIPTIONS, PROFESSEURS, SALLES)
+
+
+def get_versions(db: Session, names: Sequence[str]) -> Tuple[int, ...]:
+    """Current versions of the given tables, in the same order, in one query (0 when never bumped)"""
+    found = dict(db.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(names)).all())
+    return tuple(found.get(name) or 0 for name in names)
+
+
+def bump_version(db: Session, *names: str):
+    """Move the given tables to a new version; committed with the caller's transaction"""
+    updated = db.query(DataVersion).filter(DataVersion.name.in_(names)).update(
+        {DataVersion.version: DataVersion.version + 1}, synchronize_session=False
+    )
+    if updated < len(names):
+        existing = {name for (name,) in db.query(DataVersion.name).filter(DataVersion.name.in_(names)).all()}
+        db.add_all(DataVersion(name=name, version=1) for name in names if name not in existing)
+        db.flush()
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { generateTimetable, getConflicts, getExamens, getStatistics } from '../services/api';
+import { runTimetableJob, getConflicts, getExamens, getStatistics } from '../services/api';
 import './Dashboard.css';
 
 const AdminDashboard = () => {
@@ -50,17 +50,20 @@ const AdminDashboard = () => {
     setMessage('');
 
     try {
-      const response = await generateTimetable({
+      const job = await runTimetableJob({
         start_date: startDate,
         end_date: endDate,
         exam_start_time: '09:00',
         exam_end_time: '17:00'
+      }, (progress) => {
+        setMessage(`Generating... ${Math.round(progress.percent)}% (${progress.modules_scheduled} modules scheduled)`);
       });
+      const result = job.result;
 
-      if (response.data.success) {
-        setMessage(`Success! Generated ${response.data.generated_exams} exams.`);
+      if (result.success) {
+        setMessage(`Success! Generated ${result.generated_exams} exams.`);
       } else {
-        setMessage(`Generation completed with ${response.data.conflicts.length} conflicts.`);
+        setMessage(`Generation completed with ${result.conflicts.length} conflicts.`);
       }
 
       // Reload exams and conflicts
@@ -69,8 +72,8 @@ const AdminDashboard = () => {
       await loadStatistics();
 
       // Show conflicts if any
-      if (response.data.conflicts && response.data.conflicts.length > 0) {
-        setConflicts(response.data.conflicts);
+      if (result.conflicts && result.conflicts.length > 0) {
+        setConflicts(result.conflicts);
       }
     } catch (error) {
       setMessage('Error generating timetable: ' + (error.response?.data?.detail || error.message));
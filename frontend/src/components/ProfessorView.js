@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getProfesseurs, getProfessorTimetable } from '../services/api';
+import { fetchAllPages, getProfessorTimetable } from '../services/api';
 import './Dashboard.css';
 
 const ProfessorView = () => {
@@ -20,10 +20,10 @@ const ProfessorView = () => {
 
   const loadProfessors = async () => {
     try {
-      const response = await getProfesseurs();
-      setProfessors(response.data);
-      if (response.data.length > 0) {
-        setSelectedProfessor(response.data[0].id);
+      const rows = await fetchAllPages('/api/professeurs', { fields: 'nom,specialite' });
+      setProfessors(rows);
+      if (rows.length > 0) {
+        setSelectedProfessor(rows[0].id);
       }
     } catch (error) {
       console.error('Error loading professors:', error);
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getEtudiants, getStudentTimetable } from '../services/api';
+import { fetchAllPages, getStudentTimetable } from '../services/api';
 import './Dashboard.css';
 
 const StudentView = () => {
@@ -20,10 +20,10 @@ const StudentView = () => {
 
   const loadStudents = async () => {
     try {
-      const response = await getEtudiants();
-      setStudents(response.data);
-      if (response.data.length > 0) {
-        setSelectedStudent(response.data[0].id);
+      const rows = await fetchAllPages('/api/etudiants', { fields: 'nom,prenom,matricule' });
+      setStudents(rows);
+      if (rows.length > 0) {
+        setSelectedStudent(rows[0].id);
       }
     } catch (error) {
       console.error('Error loading students:', error);
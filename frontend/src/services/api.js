@@ -39,6 +39,29 @@ api.interceptors.response.use(
   }
 );
 
+// Paginated lists (etudiants, modules, professeurs, examens): pages of `limit`
+// rows in id order, the next page starting after the id sent in X-Next-Cursor.
+// `fields: 'nom,prenom'` in params selects only those columns (plus id).
+export async function* iteratePages(url, params = {}, pageSize = 500) {
+  let afterId = null;
+  do {
+    const response = await api.get(url, {
+      params: { ...params, limit: pageSize, ...(afterId ? { after_id: afterId } : {}) },
+    });
+    yield response.data;
+    afterId = response.headers['x-next-cursor'];
+  } while (afterId);
+}
+
+// Every row of a paginated list, fetched page by page
+export const fetchAllPages = async (url, params = {}, pageSize = 500) => {
+  const rows = [];
+  for await (const page of iteratePages(url, params, pageSize)) {
+    rows.push(...page);
+  }
+  return rows;
+};
+
 // Departments
 export const getDepartements = () => api.get('/api/departements');
 export const createDepartement = (data) => api.post('/api/departements', data);
@@ -52,17 +75,20 @@ export const createFormation = (data) => api.post('/api/formations', data);
 export const getModules = (formationId) => 
   api.get('/api/modules', { params: formationId ? { formation_id: formationId } : {} });
 export const createModule = (data) => api.post('/api/modules', data);
+export const iterateModules = (params, pageSize) => iteratePages('/api/modules', params, pageSize);
 
 // Students
 export const getEtudiants = (formationId) => 
   api.get('/api/etudiants', { params: formationId ? { formation_id: formationId } : {} });
 export const createEtudiant = (data) => api.post('/api/etudiants', data);
+export const iterateEtudiants = (params, pageSize) => iteratePages('/api/etudiants', params, pageSize);
 export const getStudentTimetable = (studentId) => api.get(`/api/etudiants/${studentId}/timetable`);
 
 // Professors
 export const getProfesseurs = (deptId) => 
   api.get('/api/professeurs', { params: deptId ? { dept_id: deptId } : {} });
 export const createProfesseur = (data) => api.post('/api/professeurs', data);
+export const iterateProfesseurs = (params, pageSize) => iteratePages('/api/professeurs', params, pageSize);
 export const getProfessorTimetable = (profId) => api.get(`/api/professeurs/${profId}/timetable`);
 
 // Buildings
@@ -77,6 +103,7 @@ export const createSalle = (data) => api.post('/api/salles', data);
 // Exams
 export const getExamens = (params = {}) => api.get('/api/examens', { params });
 export const createExamen = (data) => api.post('/api/examens', data);
+export const iterateExamens = (params, pageSize) => iteratePages('/api/examens', params, pageSize);
 export const deleteExamen = (id) => api.delete(`/api/examens/${id}`);
 
 // Exam Approvals
@@ -89,6 +116,24 @@ export const approveExamViceDean = (examenId, approved) =>
 
 // Timetable Generation
 export const generateTimetable = (data) => api.post('/api/timetable/generate', data);
+export const previewTimetable = (data) => api.post('/api/timetable/generate', { ...data, dry_run: true });
+export const submitTimetableJob = (data) => api.post('/api/timetable/jobs', data);
+export const getTimetableJob = (jobId) => api.get(`/api/timetable/jobs/${jobId}`);
+
+// Submit a background generation and poll it until it finishes.
+// onProgress receives the job on every poll; resolves with the finished job.
+export const runTimetableJob = async (data, onProgress, intervalMs = 1000) => {
+  let { data: job } = await submitTimetableJob(data);
+  while (job.status === 'queued' || job.status === 'running') {
+    if (onProgress) onProgress(job);
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    ({ data: job } = await getTimetableJob(job.id));
+  }
+  if (job.status === 'failed') {
+    throw new Error(job.error || 'Timetable generation failed');
+  }
+  return job;
+};
 
 // Conflicts
 export const getConflicts = (startDate, endDate) => 
@@ -19,7 +19,8 @@ CREATE TABLE IF NOT EXISTS modules (
     id SERIAL PRIMARY KEY,
     nom VARCHAR(150),
     credits INT,
-    formation_id INT REFERENCES formations(id)
+    formation_id INT REFERENCES formations(id),
+    duree_examen INT DEFAULT 120
 );
 
 -- =========================
@@ -116,6 +117,21 @@ CREATE TABLE IF NOT EXISTS surveillances (
     PRIMARY KEY (examen_id, prof_id)
 );
 
+-- =========================
+-- VERSIONS DES DONNEES
+-- Un compteur par table, incrémenté à chaque écriture (invalidation des caches, ETags)
+-- =========================
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO data_versions (name, version) VALUES
+    ('departements', 0), ('formations', 0), ('modules', 0), ('etudiants', 0), ('inscriptions', 0),
+    ('professeurs', 0), ('batiments', 0), ('salles', 0), ('examens', 0)
+ON CONFLICT DO NOTHING;
+
 CREATE INDEX idx_inscriptions_etudiant ON inscriptions(etudiant_id);
 CREATE INDEX idx_inscriptions_module ON inscriptions(module_id);
 CREATE INDEX idx_examens_date ON examens(date);